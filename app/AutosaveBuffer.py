@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import DBAPIError, DataError, IntegrityError, ProgrammingError, StatementError
+
+logger = logging.getLogger(__name__)
+
+
+class AutosaveBuffer:
+    # Write-behind buffer for form autosaves. Changes for the same form are merged
+    # in memory and written at most once per `flush_interval`; a background timer
+    # writes whatever is still pending once the interval has passed. A failed write
+    # puts the fields back and is retried with backoff, so nothing acknowledged as
+    # "buffered" is dropped, unless the database rejected the fields themselves: those
+    # writes can never succeed, so the entry is logged and dropped instead.
+    MAX_RETRY_WAIT = 30.0
+    PERMANENT_ERRORS = (ProgrammingError, DataError, IntegrityError, OverflowError)
+
+    def __init__(self, flush_interval_ms=500):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.revisions = {}
+        self.last_flush = {}
+        self.timers = {}
+        self.failures = {}
+        self.app = None
+
+    def init_app(self, app):
+        self.flush_interval = app.config.get('AUTOSAVE_FLUSH_MS', 500) / 1000.0
+        self.app = app
+        app.extensions['autosave_buffer'] = self
+
+    def save(self, key, fields, revision):
+        # copied before any state changes, so a bad payload cannot burn a revision
+        fields = dict(fields)
+        with self.lock:
+            if revision <= self.revisions.get(key, -1):
+                return "stale"
+            self.revisions[key] = revision
+            entry = self.pending.setdefault(key, {"fields": {}, "revision": revision})
+            entry["fields"].update(fields)
+            entry["revision"] = revision
+
+            wait = self.last_flush.get(key, 0) + self.flush_interval - time.monotonic()
+            if wait > 0 or key in self.failures:
+                self._schedule(key, max(wait, 0))
+                return "buffered"
+
+        try:
+            written = self.flush(key)
+        except Exception:
+            # kept in the buffer and retried in the background
+            return "buffered"
+        return "saved" if written else "rejected"
+
+    def flush(self, key):
+        with self.lock:
+            entry = self.pending.pop(key, None)
+            timer = self.timers.pop(key, None)
+            self.last_flush[key] = time.monotonic()
+        if timer:
+            timer.cancel()
+        if not entry:
+            return True
+        try:
+            self._write(key, entry["fields"], entry["revision"])
+        except Exception as e:
+            if not self._permanent(e):
+                self._restore(key, entry)
+                raise
+            logger.exception("Autosave for %s was rejected by the database, dropping revision %s",
+                             key, entry["revision"])
+            with self.lock:
+                self.failures.pop(key, None)
+                # the rejected revision was never stored, so it must not make later saves stale
+                if key not in self.pending:
+                    self.revisions.pop(key, None)
+            return False
+        with self.lock:
+            self.failures.pop(key, None)
+        return True
+
+    def discard(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+            self.revisions.pop(key, None)
+            self.failures.pop(key, None)
+            timer = self.timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def _permanent(self, error):
+        # a StatementError that is not a DBAPIError wraps a failure to bind the values;
+        # DBAPI errors outside PERMANENT_ERRORS (a locked database, a lost connection) pass
+        return isinstance(error, self.PERMANENT_ERRORS) or (
+            isinstance(error, StatementError) and not isinstance(error, DBAPIError))
+
+    def _restore(self, key, entry):
+        with self.lock:
+            newer = self.pending.get(key)
+            if newer:
+                # fields saved while the write was running win over the failed ones
+                fields = dict(entry["fields"])
+                fields.update(newer["fields"])
+                newer["fields"] = fields
+            else:
+                self.pending[key] = entry
+            failures = self.failures[key] = self.failures.get(key, 0) + 1
+            self._schedule(key, min(self.flush_interval * 2 ** failures, self.MAX_RETRY_WAIT))
+
+    def _schedule(self, key, wait):
+        # callers hold self.lock
+        if key not in self.timers:
+            timer = threading.Timer(wait, self._flush_in_background, args=(key,))
+            timer.daemon = True
+            self.timers[key] = timer
+            timer.start()
+
+    def _flush_in_background(self, key):
+        with self.app.app_context():
+            try:
+                self.flush(key)
+            except Exception:
+                self.app.logger.exception("Autosave flush for %s failed, retrying (attempt %s)",
+                                          key, self.failures.get(key))
+
+    def _write(self, key, fields, revision):
+        from app import db
+        from app.models import Forms
+
+        try:
+            Forms.save_revision(key, fields, revision)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
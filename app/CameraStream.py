@@ -0,0 +1,79 @@
+from collections import deque
+import logging
+import threading
+import time
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class CameraStream:
+    # Keeps a local camera open and reads it on a background thread, so a request
+    # only grabs the newest frame. Meant for kiosks running a single worker. A camera
+    # that fails to open is retried at most every `retry_interval` seconds.
+
+    def __init__(self, indexes=(0, 1), width=640, height=480, buffer_size=4, retry_interval=5.0):
+        self.indexes = indexes
+        self.width = width
+        self.height = height
+        self.frames = deque(maxlen=buffer_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.camera = None
+        self.retry_interval = retry_interval
+        self.next_attempt = 0.0
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return True
+            if time.monotonic() < self.next_attempt:
+                return False
+            self.camera = self._open()
+            if self.camera is None:
+                self.next_attempt = time.monotonic() + self.retry_interval
+                return False
+            self.running = True
+            self.thread = threading.Thread(target=self._reader, name='camera-stream', daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        if self.camera:
+            self.camera.release()
+        self.camera = None
+
+    def latest(self, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while not self.frames:
+            if not self.running or time.monotonic() > deadline:
+                return None
+            time.sleep(0.01)
+        return self.frames[-1].copy()
+
+    def burst(self):
+        return [frame.copy() for frame in list(self.frames)]
+
+    def _open(self):
+        for index in self.indexes:
+            camera = cv2.VideoCapture(index)
+            if camera.isOpened():
+                camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+                return camera
+            logger.warning("Camera at index %s failed.", index)
+            camera.release()
+        logger.error("Could not open any camera. Please check camera permissions and connections.")
+        return None
+
+    def _reader(self):
+        while self.running:
+            success, frame = self.camera.read()
+            if success and frame is not None:
+                self.frames.append(frame)
+            else:
+                time.sleep(0.05)
@@ -0,0 +1,77 @@
+from collections import Counter
+from concurrent.futures import Future
+import queue
+import threading
+import time
+import numpy as np
+from app.Metrics import metrics
+
+
+class FaceBatcher:
+    # Collects aligned faces from the inference threads for up to `max_wait_ms` (or until
+    # `max_batch_size` is reached) and embeds them with one `embed_batch` call. The calls
+    # run on a single thread, so the model behind them needs no lock.
+
+    def __init__(self, embed_batch, max_batch_size=8, max_wait_ms=5):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batch_sizes = Counter()
+
+    def embed(self, face, timeout=None):
+        return self.submit(face).result(timeout=timeout)
+
+    def submit(self, face):
+        self._start()
+        future = Future()
+        self.queue.put((face, future))
+        return future
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        frames = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": batches,
+            "frames": frames,
+            "mean_batch_size": frames / batches if batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+    def _start(self):
+        # the thread is spawned on first use, inside the forked worker
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name='face-batcher', daemon=True)
+                self.thread.start()
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            self.batch_sizes[len(batch)] += 1
+            try:
+                with metrics.timer('face_batch_forward'):
+                    embeddings = self.embed_batch(np.concatenate([face for face, _ in batch], axis=0))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
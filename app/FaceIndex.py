@@ -0,0 +1,105 @@
+from datetime import timedelta
+import threading
+import numpy as np
+
+
+class FaceIndex:
+    # updated_at is stamped at flush, not at commit, so a row can become visible after
+    # rows with later stamps; every sync re-reads this much before the newest stamp seen
+    SYNC_OVERLAP = timedelta(minutes=5)
+
+    def __init__(self, dimension=128):
+        self.dimension = dimension
+        self.lock = threading.Lock()
+        # one sync at a time, so two requests cannot rebuild the index over each other
+        self.sync_lock = threading.Lock()
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.positions = {}
+        self.size = 0
+        self.model_name = None
+        self.synced_at = None
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        with self.lock:
+            self.positions = {}
+            self.size = 0
+            self.synced_at = None
+
+    def upsert(self, user_id, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.lock:
+            position = self.positions.get(user_id)
+            if position is None:
+                if self.size == len(self.vectors):
+                    self._grow()
+                position = self.size
+                self.positions[user_id] = position
+                self.user_ids[position] = user_id
+                self.size += 1
+            self.vectors[position] = vector
+
+    def remove(self, user_id):
+        with self.lock:
+            position = self.positions.pop(user_id, None)
+            if position is None:
+                return
+            last = self.size - 1
+            if position != last:
+                # keep rows dense by moving the last row into the hole
+                self.vectors[position] = self.vectors[last]
+                self.user_ids[position] = self.user_ids[last]
+                self.positions[int(self.user_ids[position])] = position
+            self.size = last
+
+    def search(self, embedding, k=1):
+        with self.lock:
+            if self.size == 0:
+                return []
+            distances = 1.0 - self.vectors[:self.size] @ embedding
+            k = min(k, self.size)
+            best = np.argpartition(distances, k - 1)[:k]
+            best = best[np.argsort(distances[best])]
+            return [(int(self.user_ids[i]), float(distances[i])) for i in best]
+
+    def sync(self, model_name):
+        from app.models import FaceEmbedding
+
+        with self.sync_lock:
+            if model_name != self.model_name:
+                self.clear()
+                self.model_name = model_name
+
+            query = FaceEmbedding.query.filter_by(model_name=model_name)
+            changed = query
+            if self.synced_at is not None:
+                changed = query.filter(FaceEmbedding.updated_at >= self.synced_at - self.SYNC_OVERLAP)
+            self._load(changed)
+
+            if query.count() != self.size:
+                # rows were deleted by another process, drop the users that are gone
+                stored = {user_id for user_id, in query.with_entities(FaceEmbedding.user_id)}
+                for user_id in set(self.positions) - stored:
+                    self.remove(user_id)
+                if len(stored) != self.size:
+                    # a change slipped past synced_at, rebuild from scratch
+                    self.clear()
+                    self._load(query)
+
+    def _load(self, query):
+        for embedding in query.all():
+            self.upsert(embedding.user_id, embedding.as_array())
+            if embedding.updated_at and (self.synced_at is None or embedding.updated_at > self.synced_at):
+                self.synced_at = embedding.updated_at
+
+    def _grow(self):
+        capacity = max(1024, len(self.vectors) * 2)
+        vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+        user_ids = np.empty(capacity, dtype=np.int64)
+        vectors[:self.size] = self.vectors[:self.size]
+        user_ids[:self.size] = self.user_ids[:self.size]
+        self.vectors = vectors
+        self.user_ids = user_ids
@@ -1,8 +1,89 @@
 from deepface import DeepFace
+from deepface.commons import weight_utils
+from deepface.models.facial_recognition.SFace import SFaceClient, WEIGHTS_URL
+from deepface.modules import preprocessing
 import cv2
+import logging
 import numpy as np
+import threading
+import time
+from app.CameraStream import CameraStream
+from app.FaceBatcher import FaceBatcher
+from app.Metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class FaceRecognition:
+    model_name = 'SFace'
+    # DeepFace's cosine threshold for SFace
+    distance_threshold = 0.593
+    detector_backend = 'opencv'
+    # SFace's (width, height), the same for every copy of the model
+    input_shape = (112, 112)
+    weights_file = 'face_recognition_sface_2021dec.onnx'
+
+    def __init__(self):
+        self.timings = {}
+        self.camera_mode = 'client'
+        self.camera_stream = None
+        # DeepFace caches one SFace model and one opencv detector per process. SFace's
+        # feature() runs setInput + forward on a single cv2.dnn.Net, so concurrent calls
+        # can swap results; each inference thread gets its own model instead, and the
+        # shared detector is used under a lock
+        self.local = threading.local()
+        self.deepface_lock = threading.Lock()
+        # with batching, the batcher thread embeds every face through its own cv2.dnn
+        # copy of the SFace net, which takes an N x 3 x 112 x 112 blob in one forward
+        self.batcher = None
+        self.batch_net = None
+        self.batch_net_lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['face_recognition'] = self
+        self.camera_mode = app.config.get('CAMERA_MODE', 'client')
+        if self.camera_mode == 'kiosk':
+            # started lazily so the capture thread lives in the worker, not the preloading master
+            self.camera_stream = CameraStream(buffer_size=app.config.get('CAMERA_BUFFER_SIZE', 4))
+        if app.config.get('FACE_BATCH_SIZE', 1) > 1:
+            self.batcher = FaceBatcher(self.embed_batch,
+                                       max_batch_size=app.config['FACE_BATCH_SIZE'],
+                                       max_wait_ms=app.config.get('FACE_BATCH_WAIT_MS', 5))
+        if app.config.get('FACE_MODEL_PRELOAD'):
+            self.warmup()
+
+    def warmup(self):
+        # fetches the weights and builds the detector before the workers fork; the
+        # inference threads load their own model in warm_thread
+        start = time.perf_counter()
+        model = self.get_model()
+        self.timings['model_load'] = time.perf_counter() - start
+
+        # a blank frame is enough to build the detector and run one forward pass
+        start = time.perf_counter()
+        blank = self.blank_frame()
+        with self.deepface_lock:
+            DeepFace.extract_faces(img_path=blank, detector_backend=self.detector_backend, enforce_detection=False)
+        # not through the batcher: its thread would not survive the fork
+        self.embed_one(preprocessing.normalize_input(img=blank[np.newaxis].astype(np.float32), normalization='base'))
+        self.timings['warmup_inference'] = time.perf_counter() - start
+
+    def warm_thread(self):
+        # the inference executor's initializer: loads this thread's model (or, with
+        # batching, the shared batch net) and runs one forward pass, so the first
+        # request on the thread pays for neither
+        start = time.perf_counter()
+        if self.batcher:
+            try:
+                self.get_batch_net()
+            except Exception:
+                logger.warning("Batched SFace forward unavailable, embedding per thread instead", exc_info=True)
+                self.batcher = None
+        blank = self.blank_frame()
+        self.embed(preprocessing.normalize_input(img=blank[np.newaxis].astype(np.float32), normalization='base'))
+        self.timings['thread_warmup'] = time.perf_counter() - start
+
+    def blank_frame(self):
+        return np.zeros((self.input_shape[1], self.input_shape[0], 3), dtype=np.uint8)
 
     def save_photo_to_db(self, photo_path):
         with open(photo_path, 'rb') as file:
@@ -17,6 +98,11 @@ class FaceRecognition:
         img = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
         return img
 
+    def decode_frames(self, buffers):
+        with metrics.timer('image_decode'):
+            frames = [self.blob_to_cv2_image(buffer) for buffer in buffers if buffer]
+        return [frame for frame in frames if frame is not None]
+
     def verify_face(self, frame, image):
         try:
             if frame is None:
@@ -28,39 +114,114 @@ class FaceRecognition:
             image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
 
-            result = DeepFace.verify(img1_path=frame_rgb, img2_path=image_rgb, model_name='SFace', enforce_detection=True)
+            with self.deepface_lock:
+                result = DeepFace.verify(img1_path=frame_rgb, img2_path=image_rgb, model_name='SFace', enforce_detection=True)
             return {"verified": result['verified'], "distance": result['distance']}
         except Exception as e:
             return {"verified": False, "reason": str(e)}
 
 
-    def get_image_from_database(self):
-        pass
-
-    def generate_img(self):
-        camera = cv2.VideoCapture(0) 
-        if not camera.isOpened():
-            print("Camera at index 0 failed, trying index 1...")
-            camera.release()
-            camera = cv2.VideoCapture(1)
-
-        if not camera.isOpened():
-            print("Could not open any camera. Please check camera permissions and connections.")
-            camera.release()
+    def represent(self, image):
+        if image is None:
             return None
+        start = time.perf_counter()
+        with metrics.timer('face_detection'):
+            face = self.detect(image)
+        with metrics.timer('face_embedding'):
+            embedding = self.embed(face)
+        if 'first_inference' not in self.timings:
+            self.timings['first_inference'] = time.perf_counter() - start
+        return embedding
+
+    def detect(self, image):
+        # same steps DeepFace.represent takes before model.forward
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with self.deepface_lock:
+            faces = DeepFace.extract_faces(img_path=image_rgb, detector_backend=self.detector_backend,
+                                           enforce_detection=True, align=True)
+        face = max(faces, key=lambda f: f['facial_area']['w'] * f['facial_area']['h'])
+        img = preprocessing.resize_image(img=face['face'][:, :, ::-1],
+                                         target_size=(self.input_shape[1], self.input_shape[0]))
+        return preprocessing.normalize_input(img=img, normalization='base')
+
+    def embed(self, face):
+        batcher = self.batcher
+        if batcher:
+            return batcher.embed(face)
+        return self.embed_one(face)
+
+    def embed_one(self, face):
+        embedding = np.asarray(self.get_model().forward(face), dtype=np.float32).reshape(-1)
+        return embedding / np.linalg.norm(embedding)
+
+    def embed_batch(self, faces):
+        # the blob FaceRecognizerSF.feature() builds for one face, for the whole batch:
+        # uint8 BGR in, swapped to RGB, no scaling or mean
+        images = list((faces * 255).astype(np.uint8))
+        blob = cv2.dnn.blobFromImages(images, 1.0, self.input_shape, (0, 0, 0), swapRB=True, crop=False)
+        net = self.get_batch_net()
+        net.setInput(blob)
+        embeddings = np.asarray(net.forward(), dtype=np.float32).reshape(len(images), -1)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    def get_batch_net(self):
+        with self.batch_net_lock:
+            if self.batch_net is None:
+                weights = weight_utils.download_weights_if_necessary(file_name=self.weights_file,
+                                                                     source_url=WEIGHTS_URL)
+                net = cv2.dnn.readNetFromONNX(weights)
+                # an export with a fixed batch dimension would fail or fold the batch here
+                net.setInput(np.zeros((2, 3, self.input_shape[1], self.input_shape[0]), dtype=np.float32))
+                if net.forward().shape[0] != 2:
+                    raise ValueError("SFace net does not take a batch of faces")
+                self.batch_net = net
+            return self.batch_net
+
+    def get_model(self):
+        if not hasattr(self.local, 'model'):
+            self.local.model = SFaceClient()
+        return self.local.model
+
+    def cosine_distance(self, embedding, references):
+        # references are L2-normalized rows, so a single matmul gives every cosine distance
+        return 1.0 - np.atleast_2d(references) @ embedding
+
+    def verify_embedding(self, frame, reference):
+        try:
+            if frame is None:
+                return {"verified": False, "reason": "Obraz z kamery jest pusty (None)."}
+            if reference is None:
+                return {"verified": False, "reason": "Brak zapisanego wektora twarzy."}
 
-        camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            embedding = self.represent(frame)
+            with metrics.timer('distance'):
+                distance = float(self.cosine_distance(embedding, reference)[0])
+            return {"verified": distance <= self.distance_threshold, "distance": distance}
+        except Exception as e:
+            return {"verified": False, "reason": str(e)}
 
+    def get_image_from_database(self):
+        pass
 
-        frame = None
-        for _ in range(15):
-            success, frame = camera.read()
-        
-        if not success or frame is None:
-            print("Failed to capture image after multiple attempts.")
-            camera.release()
+    def generate_img(self):
+        # in client mode frames come from the browser; opening a server camera on every
+        # request would block the worker for nothing
+        if self.camera_mode != 'kiosk':
             return None
-
-        camera.release()
-        return frame
\ No newline at end of file
+        with metrics.timer('camera_capture'):
+            return self.capture()
+
+    def generate_frames(self):
+        if self.camera_mode != 'kiosk':
+            return []
+        # a kiosk camera already holds a short burst to choose from
+        if self.camera_stream and self.camera_stream.start() and self.camera_stream.latest() is not None:
+            return self.camera_stream.burst()
+        return [self.generate_img()]
+
+    def capture(self):
+        # the stream owns the camera; when it cannot be opened the request gets no frame
+        # rather than reopening the devices itself
+        if self.camera_stream and self.camera_stream.start():
+            return self.camera_stream.latest()
+        return None
@@ -0,0 +1,106 @@
+import threading
+import cv2
+from app.Metrics import metrics
+
+
+class FrameQuality:
+    # Cheap checks on a downscaled grayscale frame, run before the face model so blurry,
+    # dark or faceless frames are rejected in a few milliseconds instead of a full
+    # detection + embedding pass.
+
+    REASONS = {
+        'no_frame': 'Could not capture image from camera.',
+        'too_dark': 'The image is too dark, please move to better light.',
+        'too_bright': 'The image is overexposed, please avoid direct light.',
+        'blurry': 'The image is blurry, please hold still.',
+        'no_face': 'No face found, please look at the camera.',
+        'face_too_small': 'Face is too far away, please move closer.',
+    }
+
+    def __init__(self):
+        self.enabled = True
+        self.width = 320
+        self.min_brightness = 40.0
+        self.max_brightness = 220.0
+        self.min_sharpness = 60.0
+        self.min_face_ratio = 0.15
+        self.local = threading.local()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FRAME_QUALITY_GATE', True)
+        self.width = app.config.get('FRAME_QUALITY_WIDTH', self.width)
+        self.min_brightness = app.config.get('FRAME_MIN_BRIGHTNESS', self.min_brightness)
+        self.max_brightness = app.config.get('FRAME_MAX_BRIGHTNESS', self.max_brightness)
+        self.min_sharpness = app.config.get('FRAME_MIN_SHARPNESS', self.min_sharpness)
+        self.min_face_ratio = app.config.get('FRAME_MIN_FACE_RATIO', self.min_face_ratio)
+        app.extensions['frame_quality'] = self
+
+    def detector(self):
+        # CascadeClassifier is not safe to share between threads
+        if not hasattr(self.local, 'cascade'):
+            self.local.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        return self.local.cascade
+
+    def grayscale(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if gray.shape[1] > self.width:
+            height = int(gray.shape[0] * self.width / gray.shape[1])
+            gray = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def sharpness(self, gray):
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    def measure(self, frame):
+        gray = self.grayscale(frame)
+        return {'brightness': float(gray.mean()), 'gray': gray}
+
+    def check_measured(self, measured):
+        # None when the frame is good enough, otherwise a rejection dict
+        gray = measured.pop('gray')
+        if measured['brightness'] < self.min_brightness:
+            return self.reject('too_dark', measured)
+        if measured['brightness'] > self.max_brightness:
+            return self.reject('too_bright', measured)
+
+        faces = self.detector().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+        if len(faces) == 0:
+            return self.reject('no_face', measured)
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        measured['face_ratio'] = round(w / gray.shape[1], 3)
+        if measured['face_ratio'] < self.min_face_ratio:
+            return self.reject('face_too_small', measured)
+
+        # blur is judged on the face itself, a sharp background must not pass a blurred face
+        measured['sharpness'] = self.sharpness(gray[y:y + h, x:x + w])
+        if measured['sharpness'] < self.min_sharpness:
+            return self.reject('blurry', measured)
+        return None
+
+    def select(self, frames):
+        # usable frame with the sharpest face, or the rejection of the first frame
+        frames = [frame for frame in frames if frame is not None]
+        if not self.enabled:
+            return (frames[0], None) if frames else (None, self.reject('no_frame'))
+        if not frames:
+            return None, self.reject('no_frame')
+
+        with metrics.timer('frame_quality'):
+            best, best_sharpness, rejection = None, -1.0, None
+            for frame in frames:
+                measured = self.measure(frame)
+                result = self.check_measured(measured)
+                if result is not None:
+                    rejection = rejection or result
+                elif measured['sharpness'] > best_sharpness:
+                    best, best_sharpness = frame, measured['sharpness']
+        if best is not None:
+            return best, None
+        metrics.increment(f"frame_rejections_{rejection['code']}_total")
+        return None, rejection
+
+    def reject(self, code, measured=None):
+        rejection = {'code': code, 'message': self.REASONS[code]}
+        if measured:
+            rejection['metrics'] = {key: round(value, 3) for key, value in measured.items()}
+        return rejection
@@ -0,0 +1,105 @@
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+import concurrent.futures
+import os
+import threading
+
+
+class InferenceBusy(Exception):
+    pass
+
+
+class InferenceTimeout(Exception):
+    pass
+
+
+class InferenceExecutor:
+    # Runs face inference off the request thread. At most `workers` jobs run at once
+    # and `queue_size` more may wait; anything beyond that is rejected immediately.
+    # The threads are started once per process and each runs `initializer` before it
+    # takes a job, so the per-thread models are loaded before the first request. If an
+    # initializer fails the pool is broken for good; callers get InferenceBusy and the
+    # next call builds a new pool.
+
+    def __init__(self):
+        self.executor = None
+        self.slots = None
+        self.timeout = None
+        self.workers = 1
+        self.initializer = None
+        self.pid = None
+        self.warm = 0
+        self.lock = threading.Lock()
+
+    def init_app(self, app, initializer=None):
+        self.workers = app.config.get('FACE_INFERENCE_WORKERS', 1)
+        queue_size = app.config.get('FACE_INFERENCE_QUEUE', 4)
+        self.timeout = app.config.get('FACE_INFERENCE_TIMEOUT', 10)
+        self.initializer = initializer
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)
+        app.extensions['inference_executor'] = self
+        if app.config.get('FACE_MODEL_PRELOAD'):
+            # gunicorn --preload forks the workers from this process; threads started
+            # here would not survive the fork, so each worker warms its own
+            os.register_at_fork(after_in_child=self.start)
+
+    @property
+    def ready(self):
+        return self.pid == os.getpid() and self.warm == self.workers
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.warm = 0
+            # one job per thread, held at the barrier so no thread picks up a second
+            # one and every thread gets spawned and warmed now
+            barrier = threading.Barrier(self.workers)
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='face-inference',
+                                               initializer=self._warm_thread, initargs=(barrier,))
+            for _ in range(self.workers):
+                self.executor.submit(barrier.wait)
+
+    def _warm_thread(self, barrier):
+        try:
+            if self.initializer:
+                self.initializer()
+        except Exception:
+            # the pool is broken now; the threads already waiting must not hang
+            barrier.abort()
+            raise
+        with self.lock:
+            self.warm += 1
+
+    def submit(self, fn, *args):
+        if self.pid != os.getpid():
+            self.start()
+        if not self.slots.acquire(blocking=False):
+            raise InferenceBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BrokenExecutor:
+            self.slots.release()
+            self._reset()
+            raise InferenceBusy()
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            raise InferenceTimeout()
+        except BrokenExecutor:
+            self._reset()
+            raise InferenceBusy()
+
+    def _reset(self):
+        with self.lock:
+            if self.executor is not None and self.executor._broken:
+                self.executor.shutdown(wait=False)
+                self.pid = None
@@ -0,0 +1,67 @@
+from collections import deque
+import threading
+import time
+
+
+class LoginThrottle:
+    # Sliding-window count of failed logins per client IP and per username. Checked
+    # before the password is hashed, so brute-force traffic costs a dict lookup.
+    # Counts are per process, like the user cache.
+
+    def __init__(self):
+        self.window = 300.0
+        self.max_per_ip = 20
+        self.max_per_username = 5
+        self.max_keys = 10000
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.window = app.config.get('LOGIN_THROTTLE_WINDOW', self.window)
+        self.max_per_ip = app.config.get('LOGIN_MAX_FAILURES_PER_IP', self.max_per_ip)
+        self.max_per_username = app.config.get('LOGIN_MAX_FAILURES_PER_USERNAME', self.max_per_username)
+        app.extensions['login_throttle'] = self
+
+    def keys(self, ip, username=None):
+        # face identification has no username, only the client IP is counted
+        if username is None:
+            return (('ip', ip, self.max_per_ip),)
+        return (('ip', ip, self.max_per_ip), ('user', username.lower(), self.max_per_username))
+
+    def retry_after(self, ip, username=None):
+        # seconds until another attempt is allowed, 0 when it is allowed now
+        now = time.monotonic()
+        wait = 0.0
+        with self.lock:
+            for kind, value, limit in self.keys(ip, username):
+                attempts = self._recent((kind, value), now)
+                if attempts is not None and len(attempts) >= limit:
+                    wait = max(wait, attempts[0] + self.window - now)
+        return int(wait) + 1 if wait else 0
+
+    def failed(self, ip, username=None):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.failures) >= self.max_keys:
+                self._prune(now)
+            for kind, value, _ in self.keys(ip, username):
+                self.failures.setdefault((kind, value), deque()).append(now)
+
+    def succeeded(self, username):
+        with self.lock:
+            self.failures.pop(('user', username.lower()), None)
+
+    def _recent(self, key, now):
+        attempts = self.failures.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self.failures[key]
+            return None
+        return attempts
+
+    def _prune(self, now):
+        for key in list(self.failures):
+            self._recent(key, now)
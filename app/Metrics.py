@@ -0,0 +1,87 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    # Per-process stage timings and counters, rendered in the Prometheus text format.
+    # Each gunicorn worker keeps its own numbers; scrape every worker or aggregate.
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix='beeroverflow'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.slow_query_threshold = None
+
+    def init_app(self, app):
+        self.slow_query_threshold = app.config.get('SLOW_QUERY_THRESHOLD', 0.5)
+        app.extensions['metrics'] = self
+        if app.config.get('SQLALCHEMY_RECORD_QUERIES'):
+            app.after_request(self.record_queries)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.BUCKETS)
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_queries(self, response):
+        from flask import current_app
+        from flask_sqlalchemy.record_queries import get_recorded_queries
+
+        for query in get_recorded_queries():
+            self.observe('db_query', query.duration)
+            if query.duration >= self.slow_query_threshold:
+                self.increment('slow_queries_total')
+                current_app.logger.warning('Slow query (%.3fs) at %s: %s', query.duration, query.location, query.statement)
+        return response
+
+    def render(self, gauges=None):
+        lines = [f'# TYPE {self.prefix}_stage_seconds histogram']
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{self.prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{self.prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{self.prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {self.prefix}_{name} counter')
+                lines.append(f'{self.prefix}_{name} {value}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {self.prefix}_{name} gauge')
+            lines.append(f'{self.prefix}_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,41 @@
+from functools import wraps
+from flask import request
+
+
+class PageCache:
+    # Keeps the rendered HTML of pages that do not depend on who is asking. Views opt
+    # in with @page_cache.cached(), optionally with a condition checked per request.
+    # Entries live for the whole process, since the templates only change on deploy.
+
+    def __init__(self):
+        self.enabled = False
+        self.pages = {}
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PAGE_CACHE', not app.debug)
+        app.extensions['page_cache'] = self
+
+    def cached(self, condition=None):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or (condition is not None and not condition()):
+                    return view(*args, **kwargs)
+                key = (request.endpoint, request.path)
+                page = self.pages.get(key)
+                if page is None:
+                    self.misses += 1
+                    page = self.pages[key] = view(*args, **kwargs)
+                else:
+                    self.hits += 1
+                return page
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.pages.clear()
+
+    def stats(self):
+        return {"size": len(self.pages), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Password hashing with a configurable Werkzeug method (e.g. 'scrypt:32768:8:1' or
+    # 'pbkdf2:sha256:600000'). Hashes run on a small pool, so a login spike occupies at
+    # most `workers` threads; hashlib releases the GIL while it works, so the rest of
+    # the worker keeps serving. Anything past `queue_size` waiting hashes is refused.
+
+    def __init__(self):
+        self.method = 'scrypt'
+        self.prefix = None
+        self.executor = None
+        self.slots = None
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        # the stored prefix carries the full parameters, e.g. 'scrypt:32768:8:1'
+        self.prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.slots = threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_QUEUE', 16))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        app.extensions['password_hasher'] = self
+
+    def run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return self.prefix is not None and password_hash.split('$', 1)[0] != self.prefix
@@ -0,0 +1,85 @@
+from flask import request, url_for, Response
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class StaticAssets:
+    # Fingerprints every file under the static folder at startup (styles.css ->
+    # styles.3f2a9c1d0b7e.css) and keeps gzip/brotli copies in memory. Fingerprinted
+    # URLs never change content, so browsers may cache them forever; templates link
+    # them through static_url(). With --preload the build runs once, in the master.
+
+    COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+    MAX_AGE = 365 * 24 * 3600
+
+    def __init__(self):
+        self.enabled = False
+        self.manifest = {}
+        self.assets = {}
+
+    def init_app(self, app):
+        # off in debug, so edited files show up without a restart
+        self.enabled = app.config.get('STATIC_FINGERPRINT', not app.debug)
+        app.add_template_global(self.url, 'static_url')
+        app.add_url_rule('/assets/<path:filename>', endpoint='assets', view_func=self.serve)
+        app.extensions['static_assets'] = self
+        if self.enabled:
+            self.build(app.static_folder)
+
+    def build(self, folder):
+        manifest, assets = {}, {}
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, folder).replace(os.sep, '/')
+                with open(path, 'rb') as file:
+                    data = file.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                stem, extension = os.path.splitext(filename)
+                hashed = f'{stem}.{digest}{extension}'
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+                encodings = {'identity': data}
+                if mimetype.startswith(self.COMPRESSIBLE):
+                    encodings['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+                    if brotli is not None:
+                        encodings['br'] = brotli.compress(data)
+                manifest[filename] = hashed
+                assets[hashed] = {'mimetype': mimetype, 'etag': digest, 'encodings': encodings}
+        self.manifest, self.assets = manifest, assets
+        return manifest
+
+    def url(self, filename):
+        hashed = self.manifest.get(filename) if self.enabled else None
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        asset = self.assets.get(filename)
+        if asset is None:
+            return Response('Not Found', status=404, mimetype='text/plain')
+
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset['encodings'] and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        response = Response(asset['encodings'][encoding], mimetype=asset['mimetype'])
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if len(asset['encodings']) > 1:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(asset['etag'] if encoding == 'identity' else f"{asset['etag']}-{encoding}")
+        response.cache_control.public = True
+        response.cache_control.max_age = self.MAX_AGE
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
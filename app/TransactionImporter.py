@@ -0,0 +1,137 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import csv
+import json
+import time
+from sqlalchemy import insert
+from app import db
+from app.models import Transaction, DailyBalance
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class TransactionImporter:
+    # Streams CSV/JSONL records through parse -> validate -> chunk and writes each
+    # chunk with one executemany INSERT in its own transaction, so memory stays
+    # bounded by `batch_size` no matter how large the input is.
+    CENT = Decimal('0.01')
+    # Numeric(10, 2) leaves 8 digits before the decimal point
+    MAX_AMOUNT = Decimal('100000000')
+    # users.id is an INTEGER; larger ids cannot exist and would not bind
+    MAX_USER_ID = 2 ** 31
+
+    def __init__(self, batch_size=5000, user_id=None, skip_invalid=False):
+        self.batch_size = batch_size
+        self.user_id = user_id
+        self.skip_invalid = skip_invalid
+        self.types = set(Transaction.CREDIT_TYPES + Transaction.DEBIT_TYPES)
+        self.imported = 0
+        self.invalid = 0
+        self.errors = []
+        self.days = {}
+
+    def records(self, lines, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(lines)
+        else:
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+
+    def validate(self, record, row_number):
+        if not isinstance(record, dict):
+            raise InvalidRow(f"row {row_number}: not a JSON object")
+        try:
+            amount = Decimal(str(record['amount']).strip())
+        except (KeyError, InvalidOperation):
+            raise InvalidRow(f"row {row_number}: amount must be a decimal number")
+        # range first: Infinity/NaN and huge exponents would make quantize raise
+        if not amount.is_finite() or not 0 < amount < self.MAX_AMOUNT or amount != amount.quantize(self.CENT):
+            raise InvalidRow(f"row {row_number}: amount must be positive, below {self.MAX_AMOUNT} with at most 2 decimals")
+
+        transaction_type = str(record.get('transaction_type') or '').strip().lower()
+        if transaction_type not in self.types:
+            raise InvalidRow(f"row {row_number}: unknown transaction_type '{transaction_type}'")
+
+        user_id = self.user_id if self.user_id is not None else self.validate_user_id(record.get('user_id'), row_number)
+        description = record.get('description') or None
+        if description is not None and not isinstance(description, str):
+            raise InvalidRow(f"row {row_number}: description must be a string")
+
+        try:
+            created_at = datetime.fromisoformat(record['created_at']) if record.get('created_at') else datetime.utcnow()
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidRow(f"row {row_number}: {e}")
+
+        return {
+            'user_id': user_id,
+            'amount': amount,
+            'transaction_type': transaction_type,
+            'description': description,
+            'created_at': created_at,
+        }
+
+    def validate_user_id(self, value, row_number):
+        # CSV gives strings, JSONL ints; a float or bool would be truncated by int()
+        if isinstance(value, str) and value.strip().isdecimal():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 < value < self.MAX_USER_ID:
+            raise InvalidRow(f"row {row_number}: user_id must be a positive integer below {self.MAX_USER_ID}")
+        return value
+
+    def rows(self, records):
+        for row_number, record in enumerate(records, start=1):
+            try:
+                yield self.validate(record, row_number)
+            except InvalidRow as e:
+                self.invalid += 1
+                if len(self.errors) < 20:
+                    self.errors.append(str(e))
+                if not self.skip_invalid:
+                    raise
+
+    def chunks(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def run(self, lines, fmt):
+        start = time.perf_counter()
+        aborted = False
+        try:
+            for chunk in self.chunks(self.rows(self.records(lines, fmt))):
+                db.session.execute(insert(Transaction), chunk)
+                db.session.commit()
+                self.imported += len(chunk)
+                for row in chunk:
+                    self.days.setdefault(row['user_id'], set()).add(row['created_at'].date())
+        except InvalidRow:
+            # chunks committed before the bad row stay imported
+            aborted = True
+        finally:
+            db.session.rollback()
+            # bulk inserts skip the ORM flush hook, so the aggregates are rebuilt once at the end
+            for user_id, days in self.days.items():
+                DailyBalance.refresh(db.session.connection(), user_id, min(days), max(days))
+            db.session.commit()
+
+        return self.stats(time.perf_counter() - start, aborted)
+
+    def stats(self, seconds, aborted=False):
+        return {
+            "aborted": aborted,
+            "imported": self.imported,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.imported / seconds, 1) if seconds else 0.0,
+        }
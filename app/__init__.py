@@ -1,12 +1,36 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
+from sqlalchemy import event
 from config import config
+from app.FaceRecognition import FaceRecognition
+from app.FaceIndex import FaceIndex
+from app.InferenceExecutor import InferenceExecutor
+from app.UserCache import UserCache
+from app.AutosaveBuffer import AutosaveBuffer
+from app.Metrics import metrics
+from app.FrameQuality import FrameQuality
+from app.PasswordHasher import PasswordHasher
+from app.LoginThrottle import LoginThrottle
+from app.StaticAssets import StaticAssets
+from app.PageCache import PageCache
 import os
+import time
 
 db = SQLAlchemy()
 migrate = Migrate()
+face_recognition = FaceRecognition()
+face_index = FaceIndex()
+inference = InferenceExecutor()
+user_cache = UserCache()
+autosave_buffer = AutosaveBuffer()
+frame_quality = FrameQuality()
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
+static_assets = StaticAssets()
+page_cache = PageCache()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page'
@@ -16,24 +40,68 @@ login_manager.login_message_category = 'info'
 @login_manager.user_loader
 def load_user(user_id):
     from app.models import User
-    return User.query.get(int(user_id))
+    return user_cache.get(int(user_id), User.query.get)
 
 
-def create_app(config_name=None):
+def configure_sqlite(app):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if app.config.get('SQLITE_WAL'):
+            # readers no longer block the writer, and vice versa
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+        cursor.close()
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', on_connect)
+
+
+def create_app(config_name=None, overrides=None):
+    start = time.perf_counter()
     app = Flask(__name__)
     
-    app.config.from_object(config['default'])
+    if config_name is None:
+        config_name = 'default'
+    if config_name not in config:
+        # a mistyped FLASK_ENV must not quietly start the development config
+        raise ValueError(f"Unknown config {config_name!r}, expected one of {', '.join(sorted(config))}")
+    app.config.from_object(config[config_name])
+    app.config.update(overrides or {})
+    if app.config.get('PROXY_FIX_HOPS'):
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     
     db.init_app(app)
+    configure_sqlite(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    face_recognition.init_app(app)
+    inference.init_app(app, initializer=face_recognition.warm_thread)
+    user_cache.init_app(app)
+    autosave_buffer.init_app(app)
+    metrics.init_app(app)
+    frame_quality.init_app(app)
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    static_assets.init_app(app)
+    page_cache.init_app(app)
     
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
-    
+
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    from app.commands import transactions_cli, faces_cli
+    app.cli.add_command(transactions_cli)
+    app.cli.add_command(faces_cli)
+
+    app.extensions['startup_timings'] = {'create_app': time.perf_counter() - start}
     return app
 
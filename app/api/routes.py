@@ -0,0 +1,52 @@
+from datetime import datetime, date, timedelta
+from flask import jsonify, request
+from flask_login import login_required, current_user
+from app import db
+from app.api import bp
+from app.models import Transaction, DailyBalance
+
+MAX_PAGE_SIZE = 200
+
+
+def parse_cursor(cursor):
+    created_at, transaction_id = cursor.rsplit(',', 1)
+    return datetime.fromisoformat(created_at), int(transaction_id)
+
+
+@bp.route('/transactions')
+@login_required
+def transactions():
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    query = Transaction.query.filter(Transaction.user_id == current_user.id)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, transaction_id = parse_cursor(cursor)
+        except ValueError:
+            return jsonify({"status": "error", "message": "invalid cursor"}), 400
+        # keyset pagination: seek past the last row of the previous page instead of OFFSET
+        query = query.filter(db.tuple_(Transaction.created_at, Transaction.id) < (created_at, transaction_id))
+
+    rows = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = f"{last.created_at.isoformat()},{last.id}"
+
+    return jsonify({"transactions": [row.to_dict() for row in page], "next_cursor": next_cursor})
+
+
+@bp.route('/balance')
+@login_required
+def balance():
+    days = max(1, min(request.args.get('days', 30, type=int), 366))
+    since = date.today() - timedelta(days=days - 1)
+    daily = DailyBalance.query.filter(DailyBalance.user_id == current_user.id, DailyBalance.day >= since) \
+        .order_by(DailyBalance.day).all()
+    return jsonify({
+        "balance": str(DailyBalance.balance(current_user.id)),
+        "daily": [row.to_dict() for row in daily],
+    })
+
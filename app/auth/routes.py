@@ -1,10 +1,19 @@
 from flask import render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from app import db
+from app import db, user_cache, login_throttle
+from app.PasswordHasher import HashingBusy
 from app.auth import bp
 from app.models import User
 
 
+@bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    flash('Too many sign-ins at once, please try again in a moment.', 'warning')
+    if request.endpoint == 'auth.register':
+        return render_template('auth/register.html', title='Rejestracja'), 503, {'Retry-After': '1'}
+    return render_template('auth/login.html', title='Login'), 503, {'Retry-After': '1'}
+
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -15,18 +24,27 @@ def login():
         password = request.form.get('password', '')
         remember_me = bool(request.form.get('remember_me'))
         
+        retry_after = login_throttle.retry_after(request.remote_addr, username)
+        if retry_after:
+            flash('Too many failed attempts, please try again later.', 'danger')
+            return render_template('auth/login.html', title='Login'), 429, {'Retry-After': str(retry_after)}
+
         if not username or not password:
             flash('File all the fields', 'danger')
         else:
             user = User.query.filter_by(username=username).first()
             
             if user and user.check_password(password):
+                login_throttle.succeeded(username)
+                if db.session.dirty:
+                    db.session.commit()
                 login_user(user, remember=remember_me)
                 next_page = request.args.get('next')
                 if not next_page or not next_page.startswith('/'):
                     next_page = url_for('main.dashboard')
                 return redirect(next_page)
             
+            login_throttle.failed(request.remote_addr, username)
             flash('Uncorrect username or password.', 'danger')
     
     return render_template('auth/login.html', title='Login')
@@ -85,6 +103,7 @@ def register():
 @bp.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
@@ -0,0 +1,61 @@
+import os
+import click
+from flask.cli import AppGroup
+from app.TransactionImporter import TransactionImporter
+
+transactions_cli = AppGroup('transactions', help='Manage transactions.')
+
+
+@transactions_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT/transaction.')
+@click.option('--user-id', type=int, help='Import every row for this user instead of the user_id column.')
+@click.option('--skip-invalid', is_flag=True, help='Skip invalid rows instead of stopping at the first one.')
+def import_transactions(path, fmt, batch_size, user_id, skip_invalid):
+    """Bulk import transactions from a CSV or JSONL file."""
+    fmt = fmt or ('csv' if os.path.splitext(path)[1].lower() == '.csv' else 'jsonl')
+    importer = TransactionImporter(batch_size=batch_size, user_id=user_id, skip_invalid=skip_invalid)
+    with open(path, newline='', encoding='utf-8') as lines:
+        stats = importer.run(lines, fmt)
+
+    for error in stats['errors']:
+        click.echo(error, err=True)
+    click.echo(f"Imported {stats['imported']} rows ({stats['invalid']} invalid) "
+               f"in {stats['seconds']}s - {stats['rows_per_second']} rows/s")
+    if stats['aborted']:
+        raise click.ClickException('Import stopped at the first invalid row (use --skip-invalid to continue past it).')
+
+
+faces_cli = AppGroup('faces', help='Manage stored face embeddings.')
+
+
+@faces_cli.command('backfill')
+@click.option('--batch-size', default=50, show_default=True, help='Users embedded per commit.')
+def backfill_embeddings(batch_size):
+    """Embed stored photos that have no up-to-date face embedding, so /identify-face can find them."""
+    from app import db, face_recognition
+    from app.models import User, UserPhoto, FaceEmbedding
+
+    outdated = db.or_(
+        FaceEmbedding.user_id.is_(None),
+        FaceEmbedding.model_name != face_recognition.model_name,
+        FaceEmbedding.photo_hash != UserPhoto.photo_hash,
+    )
+    stale = db.session.query(User.id).join(UserPhoto, UserPhoto.user_id == User.id) \
+        .outerjoin(FaceEmbedding, FaceEmbedding.user_id == User.id).filter(outdated)
+    user_ids = [user_id for user_id, in stale]
+
+    embedded = failed = 0
+    for start in range(0, len(user_ids), batch_size):
+        for user_id in user_ids[start:start + batch_size]:
+            user = User.query.options(db.joinedload(User.photo_record), db.joinedload(User.face_embedding)).get(user_id)
+            try:
+                user.refresh_face_embedding(face_recognition)
+                embedded += 1
+            except Exception as e:
+                failed += 1
+                click.echo(f"user {user_id}: {e}", err=True)
+        db.session.commit()
+
+    click.echo(f"Embedded {embedded} of {len(user_ids)} stored photos ({failed} failed)")
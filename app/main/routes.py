@@ -1,13 +1,13 @@
-from flask import render_template, jsonify, request
-from flask_login import login_required, current_user
+from flask import render_template, jsonify, request, current_app, Response, session
+from flask_login import login_required, current_user, login_user
 from app.main import bp
-from app.FaceRecognition import FaceRecognition
+from app import face_recognition, face_index, inference, user_cache, autosave_buffer, metrics, frame_quality, page_cache, \
+    login_throttle
+from app.InferenceExecutor import InferenceBusy, InferenceTimeout
 import cv2
-from app.models import User, Forms
+from app.models import User, Forms, DailyBalance
 from app.models import db
 
-face_recognition = FaceRecognition()
-
 @bp.route('/example-data')
 def seed():
     photo_to_save = face_recognition.save_photo_to_db("images/hubert.jpg")
@@ -15,17 +15,59 @@ def seed():
         username="chujchujchuj",
         email="chujchujchuj@chujchujchuj.com",
         first_name="chujchujchuj",
-        last_name="chujchujchuj",
-        photo=photo_to_save
+        last_name="chujchujchuj"
     )
     user.set_password("chujchujchuj12345")
+    user.set_photo(photo_to_save, face_recognition)
 
     db.session.add(user)
     db.session.commit()
 
     return "User created!"
 
+@bp.errorhandler(InferenceBusy)
+def inference_busy(e):
+    response = jsonify({"result": False, "reason": "Face verification is busy, please retry.", "retry": True})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+@bp.errorhandler(InferenceTimeout)
+def inference_timeout(e):
+    return jsonify({"result": False, "reason": "Face verification timed out.", "retry": True}), 504
+
+@bp.route('/ready')
+def ready():
+    timings = dict(current_app.extensions['startup_timings'])
+    timings.update(face_recognition.timings)
+    # ready once every inference thread of this worker has its model; a probe starts
+    # the warm-up in workers that were not forked from a preloading master
+    inference.start()
+    status = 200 if inference.ready else 503
+    return jsonify({"ready": inference.ready, "model": face_recognition.model_name, "timings": timings}), status
+
+@bp.route('/stats')
+def stats():
+    data = {"user_cache": user_cache.stats(), "page_cache": page_cache.stats()}
+    if face_recognition.batcher:
+        data["face_batching"] = face_recognition.batcher.stats()
+    return jsonify(data)
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    gauges = {f'user_cache_{name}': value for name, value in user_cache.stats().items()
+              if isinstance(value, (int, float))}
+    gauges.update({f'page_cache_{name}': value for name, value in page_cache.stats().items()})
+    if face_recognition.batcher:
+        gauges.update({f'face_batching_{name}': value for name, value in face_recognition.batcher.stats().items()
+                       if isinstance(value, (int, float))})
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+def anonymous_page():
+    # the index nav changes once logged in, and flashed messages are one-off
+    return not current_user.is_authenticated and not session.get('_flashes')
+
 @bp.route('/')
+@page_cache.cached(anonymous_page)
 def index():
     return render_template('main/index.html', title='Main site')
 
@@ -34,73 +76,132 @@ def index():
 def face_check():
     return render_template("main/test.html")
 
-@bp.route("/verify-face")
+def capture_frame():
+    if request.method == "POST":
+        # frames posted by the browser, either as a multipart burst or a raw image body
+        buffers = [file.read() for file in request.files.getlist("frames")] or [request.get_data()]
+        frames = face_recognition.decode_frames(buffers)
+    else:
+        frames = face_recognition.generate_frames()
+    return frame_quality.select(frames)
+
+def frame_rejected(rejection):
+    return jsonify({"result": False, "reason": rejection["message"], "quality": rejection, "retry": True})
+
+@bp.route("/verify-face", methods=["GET", "POST"])
 @login_required
 def verify_face():
-    frame = face_recognition.generate_img()
-    if frame is None:
-        return jsonify({"result": False, "reason": "Could not capture image from camera."})
-
-    print("\n--- Rozpoczęcie weryfikacji twarzy ---")
-    print(f"[*] Sprawdzanie użytkownika: {current_user.username} (ID: {current_user.id})")
-    db_photo_blob = current_user.photo
-    if db_photo_blob:
-        db_photo_image = face_recognition.blob_to_cv2_image(db_photo_blob)
-        result = face_recognition.verify_face(frame, db_photo_image)
+    frame, rejection = capture_frame()
+    if rejection:
+        return frame_rejected(rejection)
+
+    log = current_app.logger
+    log.info("Face verification started for %s (id %s)", current_user.username, current_user.id)
+    # current_user is a cached snapshot; the photo and embedding rows come in one query
+    with metrics.timer('db_load'):
+        user = User.query.options(db.joinedload(User.photo_record), db.joinedload(User.face_embedding)).get(current_user.id)
+    if user and user.photo_record:
+        try:
+            embedding = user.refresh_face_embedding(face_recognition, run=inference.run)
+        except (InferenceBusy, InferenceTimeout):
+            raise
+        except Exception as e:
+            log.warning("Could not embed the stored photo of user %s: %s", current_user.id, e)
+            return jsonify({"result": False, "reason": "Stored photo has no detectable face."})
+        if db.session.new or db.session.dirty:
+            db.session.commit()
+        result = inference.run(face_recognition.verify_embedding, frame, embedding.as_array())
 
         if result.get("verified"):
-            print(f"[+] SUKCES: Twarz zweryfikowana dla {current_user.username} (dystans: {result.get('distance'):.2f})")
-            print("--- Zakończenie weryfikacji ---")
+            log.info("Face verified for %s (distance %.2f)", current_user.username, result.get('distance'))
             return jsonify({"result": True, "user": current_user.username})
         else:
-            print(f"[-] BŁĄD: Brak dopasowania. Powód: {result.get('reason', 'Twarze nie są zgodne')}")
+            log.info("Face verification failed for %s: %s", current_user.username, result.get('reason', 'faces do not match'))
 
-    print("--- Zakończenie weryfikacji: Nie udało się zweryfikować użytkownika ---")
+    return jsonify({"result": False, "reason": "No matching user found."})
+
+
+@bp.route("/identify-face", methods=["GET", "POST"])
+def identify_face():
+    retry_after = login_throttle.retry_after(request.remote_addr)
+    if retry_after:
+        return jsonify({"result": False, "reason": "Too many failed attempts, please try again later."}), \
+            429, {"Retry-After": str(retry_after)}
+
+    frame, rejection = capture_frame()
+    if rejection:
+        return frame_rejected(rejection)
+
+    try:
+        embedding = inference.run(face_recognition.represent, frame)
+    except (InferenceBusy, InferenceTimeout):
+        raise
+    except Exception as e:
+        return jsonify({"result": False, "reason": str(e)})
+
+    with metrics.timer('db_load'):
+        face_index.sync(face_recognition.model_name)
+    with metrics.timer('distance'):
+        matches = face_index.search(embedding, k=2)
+    # 1:N needs a stricter threshold than 1:1 verification, and the best match must
+    # clearly beat the runner-up, or false accepts grow with the number of users
+    threshold = current_app.config.get('FACE_IDENTIFY_THRESHOLD', 0.45)
+    margin = current_app.config.get('FACE_IDENTIFY_MARGIN', 0.1)
+    if matches and matches[0][1] <= threshold and (len(matches) == 1 or matches[1][1] - matches[0][1] >= margin):
+        user_id, distance = matches[0]
+        user = User.query.get(user_id)
+        if user and user.is_active:
+            login_user(user)
+            return jsonify({"result": True, "user": user.username, "distance": distance})
+
+    login_throttle.failed(request.remote_addr)
     return jsonify({"result": False, "reason": "No matching user found."})
 
 
 @bp.route('/dashboard')
 @login_required
 def dashboard():
-    return render_template('main/dashboard.html', title='Users dashboard', user=current_user)
+    balance = DailyBalance.balance(current_user.id)
+    return render_template('main/dashboard.html', title='Users dashboard', user=current_user, balance=balance)
 @bp.route('/forms')
+@login_required
+@page_cache.cached()
 def get_forms():
     return render_template('main/forms.html')
 
 @bp.route("/autosave", methods=["POST"])
+@login_required
 def autosave():
-    data = request.get_json()
-    entry = Forms.query.first()
-    if not entry:
-        entry = Forms()
-        db.session.add(entry)
-
-    for key, value in data.items():
-        if hasattr(entry, key):
-            setattr(entry, key, value)
-    db.session.commit()
-    return jsonify({"status": "saved"})
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "body must be an object"}), 400
+    revision = data.get("revision")
+    fields = data.get("fields") or {}
+    # stored in an INTEGER column; bool is an int subclass but never a revision
+    if not isinstance(revision, int) or isinstance(revision, bool) or not 0 <= revision < 2 ** 31:
+        return jsonify({"status": "error", "message": "revision required"}), 400
+    if not isinstance(fields, dict):
+        return jsonify({"status": "error", "message": "fields must be an object"}), 400
+    invalid = Forms.invalid_field(fields)
+    if invalid:
+        return jsonify({"status": "error", "message": f"{invalid} must be a string that fits the field"}), 400
+
+    # drafts are keyed by owner, so the row is only looked up when the buffer flushes
+    status = autosave_buffer.save(current_user.id, fields, revision)
+    return jsonify({"status": status, "revision": revision})
 
 @bp.route("/load", methods=["GET"])
+@login_required
 def load():
-    entry = Forms.query.first()
+    autosave_buffer.flush(current_user.id)
+    entry = Forms.query.filter_by(owner_id=current_user.id).first()
 
     if not entry:
         return jsonify({})
-    data = {
-        "name": entry.name,
-        "surname": entry.surname,
-        "id_number": entry.id_number,
-        "job": entry.job,
-        "birthday": entry.birthday,
-        "income": entry.income,
-        "address": entry.address,
-        "phone_number": entry.phone_number,
-        "email": entry.email
-    }
-    return jsonify(data)
+    return jsonify(entry.to_dict())
 
 @bp.route("/delete", methods=["POST"])
+@login_required
 def delete_data():
     data = request.get_json()
     id_number = data.get("id_number")
@@ -108,10 +209,13 @@ def delete_data():
     if not id_number:
         return jsonify({"status": "error", "message": "id_number required"}), 400
 
-    entry = Forms.query.filter_by(id_number=id_number).first()
+    # the id_number may still be waiting in the buffer
+    autosave_buffer.flush(current_user.id)
+    entry = Forms.query.filter_by(owner_id=current_user.id, id_number=id_number).first()
     if entry:
+        autosave_buffer.discard(current_user.id)
         db.session.delete(entry)
         db.session.commit()
         return jsonify({"status": "deleted", "id_number": id_number})
     else:
-        return jsonify({"status": "not found", "id_number": id_number}), 404
\ No newline at end of file
+        return jsonify({"status": "not found", "id_number": id_number}), 404
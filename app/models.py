@@ -1,7 +1,11 @@
-from app import db
+from app import db, user_cache, password_hasher
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import numpy as np
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 
 class User(UserMixin, db.Model):
@@ -16,42 +20,264 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
-    photo= db.Column(db.LargeBinary)
     transactions = db.relationship('Transaction', backref='user', lazy='dynamic')
+    photo_record = db.relationship('UserPhoto', backref='user', uselist=False, cascade='all, delete-orphan')
+    face_embedding = db.relationship('FaceEmbedding', backref='user', uselist=False, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        # hashes from an older method or cost are upgraded while the password is at hand;
+        # the caller commits, and after_update drops the cached user
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
+
+    def set_photo(self, photo, face_recognition):
+        if not photo:
+            self.photo_record = None
+            self.face_embedding = None
+            return None
+
+        record = self.photo_record or UserPhoto()
+        record.data = photo
+        record.photo_hash = hashlib.sha256(photo).hexdigest()
+        self.photo_record = record
+        return self.refresh_face_embedding(face_recognition, photo)
+
+    def refresh_face_embedding(self, face_recognition, photo=None, run=None):
+        # run(fn, *args) lets requests push the embedding through the inference executor
+        record = self.photo_record
+        if record is None:
+            self.face_embedding = None
+            return None
+
+        embedding = self.face_embedding
+        if embedding and embedding.photo_hash == record.photo_hash and embedding.model_name == face_recognition.model_name:
+            return embedding
+
+        if photo is None:
+            photo = UserPhoto.load_bytes(self.id)
+        image = face_recognition.blob_to_cv2_image(photo)
+        vector = run(face_recognition.represent, image) if run else face_recognition.represent(image)
+        if embedding is None:
+            embedding = FaceEmbedding()
+            self.face_embedding = embedding
+        embedding.model_name = face_recognition.model_name
+        embedding.photo_hash = record.photo_hash
+        embedding.set_vector(vector)
+        return embedding
     
     def __repr__(self):
         return f'<User {self.username}>'
 
+class UserPhoto(db.Model):
+    __tablename__ = 'user_photos'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    photo_hash = db.Column(db.String(64), nullable=False)
+    # deferred: loading the record (or the user) never pulls the image bytes
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def load_bytes(user_id):
+        return db.session.query(UserPhoto.data).filter_by(user_id=user_id).scalar()
+
+    def __repr__(self):
+        return f'<UserPhoto {self.user_id} - {self.photo_hash[:12]}>'
+
+class FaceEmbedding(db.Model):
+    __tablename__ = 'face_embeddings'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    model_name = db.Column(db.String(50), nullable=False)
+    photo_hash = db.Column(db.String(64), nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def set_vector(self, vector):
+        self.vector = np.asarray(vector, dtype=np.float32).tobytes()
+
+    def as_array(self):
+        return np.frombuffer(self.vector, dtype=np.float32)
+
+    def __repr__(self):
+        return f'<FaceEmbedding {self.user_id} - {self.model_name}>'
+
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # keyset pagination of a user's history walks this index
+        db.Index('ix_transactions_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+    CREDIT_TYPES = ('deposit', 'transfer_in', 'credit')
+    DEBIT_TYPES = ('withdrawal', 'transfer_out', 'payment', 'debit')
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # active history loads the old value on assignment, so refresh_daily_balances can
+    # rebuild the day a transaction is moved away from
+    user_id = db.column_property(db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False),
+                                 active_history=True)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     transaction_type = db.Column(db.String(20), nullable=False)  
     description = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    created_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow, index=True),
+                                    active_history=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "amount": str(self.amount),
+            "transaction_type": self.transaction_type,
+            "description": self.description,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
     
     def __repr__(self):
         return f'<Transaction {self.id} - {self.amount}>'
 
+class DailyBalance(db.Model):
+    __tablename__ = 'daily_balances'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    credits = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    debits = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def refresh(cls, connection, user_id, first_day, last_day):
+        # rebuild the aggregates of the given days from the transactions themselves
+        transactions = Transaction.__table__
+        table = cls.__table__
+        day = db.func.date(transactions.c.created_at)
+        start = datetime.combine(first_day, datetime.min.time())
+        end = datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+
+        connection.execute(table.delete().where(
+            table.c.user_id == user_id, table.c.day >= first_day, table.c.day <= last_day))
+        connection.execute(table.insert().from_select(
+            ['user_id', 'day', 'credits', 'debits', 'count'],
+            db.select(
+                transactions.c.user_id,
+                day,
+                db.func.sum(db.case((transactions.c.transaction_type.in_(Transaction.CREDIT_TYPES), transactions.c.amount), else_=0)),
+                db.func.sum(db.case((transactions.c.transaction_type.in_(Transaction.DEBIT_TYPES), transactions.c.amount), else_=0)),
+                db.func.count(),
+            ).where(
+                transactions.c.user_id == user_id,
+                transactions.c.created_at >= start,
+                transactions.c.created_at < end,
+            ).group_by(transactions.c.user_id, day)))
+
+    @classmethod
+    def balance(cls, user_id):
+        return db.session.query(db.func.coalesce(db.func.sum(cls.credits - cls.debits), 0)).filter(cls.user_id == user_id).scalar()
+
+    def to_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "credits": str(self.credits),
+            "debits": str(self.debits),
+            "net": str(self.credits - self.debits),
+            "count": self.count,
+        }
+
+    def __repr__(self):
+        return f'<DailyBalance {self.user_id} - {self.day}>'
+
 class Forms(db.Model):
     __tablename__ = 'forms'
+    FIELDS = ('name', 'surname', 'birthday', 'id_number', 'job', 'income', 'address', 'phone_number', 'email')
+
     id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, index=True)
     name = db.Column(db.String(200))
     surname = db.Column(db.String(200))
     birthday = db.Column(db.String(10))
-    id_number = db.Column(db.String(200))
+    id_number = db.Column(db.String(200), index=True)
     job = db.Column(db.String(200))
     income = db.Column(db.String(100))
     address = db.Column(db.String(300))
     phone_number = db.Column(db.String(50))
     email = db.Column(db.String(200))
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @classmethod
+    def invalid_field(cls, fields):
+        # the first field the columns cannot store, or None
+        for key, value in fields.items():
+            if value is not None and not isinstance(value, str):
+                return key
+            column = cls.__table__.columns.get(key) if key in cls.FIELDS else None
+            if value and column is not None and len(value) > column.type.length:
+                return key
+        return None
+
+    @classmethod
+    def save_revision(cls, owner_id, fields, revision):
+        values = {key: value for key, value in fields.items() if key in cls.FIELDS}
+        values['revision'] = revision
+        # a revision that arrives late (or through another worker) updates nothing
+        newer = cls.query.filter(cls.owner_id == owner_id, cls.revision < revision)
+        updated = newer.update(values, synchronize_session=False)
+        if not updated and not db.session.query(cls.query.filter_by(owner_id=owner_id).exists()).scalar():
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(owner_id=owner_id, **values))
+                return 1
+            except IntegrityError:
+                # another worker inserted the first draft between the check and the insert
+                updated = newer.update(values, synchronize_session=False)
+        return updated
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.FIELDS}
+        data['revision'] = self.revision
+        return data
+
     def __repr__(self):
         return f'<Forms {self.id} - {self.id_number}>'
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_stale_users(session, flush_context):
+    # dropped from the cache once the transaction commits, so a concurrent request
+    # cannot cache the old row again between the flush and the commit
+    stale = session.info.setdefault('stale_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj not in session.new:
+            stale.add(obj.id)
+        elif isinstance(obj, UserPhoto):
+            stale.add(obj.user_id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_stale_users(session):
+    for user_id in session.info.pop('stale_users', ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def forget_stale_users(session, previous_transaction):
+    # a savepoint rollback keeps the ids, the outer transaction may still commit
+    if previous_transaction.parent is None:
+        session.info.pop('stale_users', None)
+
+@event.listens_for(Session, 'after_flush')
+def refresh_daily_balances(session, flush_context):
+    days = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Transaction):
+            continue
+        # a moved transaction leaves its old (user, day) as well; history still holds
+        # the previous values until the flush is over
+        attrs = inspect(obj).attrs
+        for user_id in attrs.user_id.history.sum() or [obj.user_id]:
+            for created_at in attrs.created_at.history.sum() or [obj.created_at]:
+                if user_id is not None and created_at is not None:
+                    days.setdefault(user_id, set()).add(created_at.date())
+    for user_id, user_days in days.items():
+        DailyBalance.refresh(session.connection(), user_id, min(user_days), max(user_days))
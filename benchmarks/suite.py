@@ -0,0 +1,244 @@
+"""Offline benchmark suite: no camera, no network, comparable between commits.
+
+    python -m benchmarks.suite face --iterations 20
+    python -m benchmarks.suite intents --utterances 500
+    python -m benchmarks.suite web -c 8 -n 200 --endpoints autosave load dashboard verify-face
+    python -m benchmarks.suite all --json results/$(git rev-parse --short HEAD).json
+
+Every benchmark reports throughput and p50/p95/p99 latency in seconds. The web
+benchmark runs the 'testing' config against a throwaway SQLite file.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import io
+import itertools
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_IMAGE = os.path.join(ROOT, 'images', 'photo1.jpg')
+DEFAULT_CATALOGUE = os.path.join(ROOT, 'id.csv')
+ENDPOINTS = ('autosave', 'load', 'dashboard', 'verify-face')
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = np.asarray(latencies, dtype=np.float64)
+
+    def percentile(q):
+        return round(float(np.percentile(latencies, q)), 6) if len(latencies) else 0.0
+
+    return {
+        'count': int(len(latencies)),
+        'errors': errors,
+        'throughput_per_s': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'p50_s': percentile(50),
+        'p95_s': percentile(95),
+        'p99_s': percentile(99),
+        'elapsed_s': round(elapsed, 3),
+    }
+
+
+def measure(fn, iterations, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_face(image_path, iterations):
+    from app.FaceRecognition import FaceRecognition
+
+    face_recognition = FaceRecognition()
+    with open(image_path, 'rb') as file:
+        blob = file.read()
+    frame = face_recognition.blob_to_cv2_image(blob)
+    reference = face_recognition.represent(frame)
+
+    return {
+        'image': os.path.relpath(image_path, ROOT),
+        'blob_to_cv2_image': measure(lambda: face_recognition.blob_to_cv2_image(blob), iterations * 10),
+        # the legacy path embeds both images on every call
+        'verify_face': measure(lambda: face_recognition.verify_face(frame, frame), iterations),
+        'verify_embedding': measure(lambda: face_recognition.verify_embedding(frame, reference), iterations),
+    }
+
+
+TEMPLATES = (
+    '{words}',
+    'I want to ask about my {words}',
+    'can you help me with {words}',
+    'tell me more about the {words} please',
+    'something about {words}',
+)
+
+
+def synthetic_utterances(catalogue, count, seed):
+    import pandas as pd
+
+    rows = pd.read_csv(catalogue)
+    rng = random.Random(seed)
+    utterances = []
+    for _ in range(count):
+        intent, description = rows.iloc[rng.randrange(len(rows))][['id', 'description']]
+        words = description.replace('/', ' ').split()
+        # drop a word now and then so not every utterance is an exact catalogue entry
+        if len(words) > 1 and rng.random() < 0.3:
+            words.pop(rng.randrange(len(words)))
+        utterances.append((rng.choice(TEMPLATES).format(words=' '.join(words)), intent))
+    return utterances
+
+
+def bench_intents(catalogue, count, seed):
+    from whisper_endpoint.id_matching import Matcher
+
+    matcher = Matcher(catalogue)
+    utterances = synthetic_utterances(catalogue, count, seed)
+    matcher.match(utterances[0][0])
+
+    latencies = []
+    correct = 0
+    start = time.perf_counter()
+    for text, intent in utterances:
+        begin = time.perf_counter()
+        result = matcher.match(text)
+        latencies.append(time.perf_counter() - begin)
+        correct += result == intent
+    report = summarize(latencies, time.perf_counter() - start)
+    report['accuracy'] = round(correct / len(utterances), 4)
+    report['catalogue'] = os.path.relpath(catalogue, ROOT)
+    return {'match': report}
+
+
+def create_web_app(database_path):
+    from app import create_app, db
+
+    # threads need a shared file, an in-memory SQLite database is private to each connection
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path})
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_users(app, count, photo, transactions):
+    from app import db, face_recognition
+    from app.models import User, Transaction
+
+    user_ids = []
+    with app.app_context():
+        now = datetime.utcnow()
+        for i in range(count):
+            user = User(username=f'bench{i}', email=f'bench{i}@example.com', first_name='Bench', last_name=str(i))
+            user.set_password('benchmark')
+            if photo:
+                user.set_photo(photo, face_recognition)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add_all(Transaction(user_id=user.id, amount=(j % 7 + 1) * 10,
+                                           transaction_type='deposit' if j % 3 else 'payment',
+                                           created_at=now - timedelta(hours=j))
+                               for j in range(transactions))
+            user_ids.append(user.id)
+        db.session.commit()
+    return user_ids
+
+
+def bench_web(endpoints, concurrency, requests, image_path, transactions):
+    with open(image_path, 'rb') as file:
+        photo = file.read()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_web_app(os.path.join(directory, 'benchmark.db'))
+        user_ids = seed_users(app, concurrency, photo if 'verify-face' in endpoints else None, transactions)
+        revisions = itertools.count(1)
+        local = threading.local()
+        next_user = itertools.count()
+
+        def client():
+            # one logged-in client, and one user, per worker thread
+            if not hasattr(local, 'client'):
+                local.client = app.test_client()
+                with local.client.session_transaction() as session:
+                    session['_user_id'] = str(user_ids[next(next_user) % len(user_ids)])
+                    session['_fresh'] = True
+            return local.client
+
+        calls = {
+            'autosave': lambda c: c.post('/autosave', json={'revision': next(revisions),
+                                                            'fields': {'name': 'Bench', 'job': str(time.time())}}),
+            'load': lambda c: c.get('/load'),
+            'dashboard': lambda c: c.get('/dashboard'),
+            'verify-face': lambda c: c.post('/verify-face', data={'frames': (io.BytesIO(photo), 'frame.jpg')},
+                                            content_type='multipart/form-data'),
+        }
+
+        results = {}
+        for endpoint in endpoints:
+            call = calls[endpoint]
+
+            def timed_call(_):
+                begin = time.perf_counter()
+                response = call(client())
+                return time.perf_counter() - begin, response.status_code < 400
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(timed_call, range(concurrency)))
+                start = time.perf_counter()
+                outcomes = list(executor.map(timed_call, range(requests)))
+                elapsed = time.perf_counter() - start
+            results[endpoint] = summarize([latency for latency, ok in outcomes if ok], elapsed,
+                                          errors=sum(1 for _, ok in outcomes if not ok))
+            results[endpoint]['concurrency'] = concurrency
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('suite', choices=('face', 'intents', 'web', 'all'))
+    parser.add_argument('--image', default=DEFAULT_IMAGE, help='stored frame replayed as the camera image')
+    parser.add_argument('--iterations', type=int, default=20, help='face verification calls per measurement')
+    parser.add_argument('--catalogue', default=DEFAULT_CATALOGUE)
+    parser.add_argument('--utterances', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('-n', '--requests', type=int, default=100, help='requests per endpoint')
+    parser.add_argument('--transactions', type=int, default=200, help='seeded transactions per user')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    report = {'commit': git_commit(), 'created_at': datetime.utcnow().isoformat(timespec='seconds')}
+    if args.suite in ('face', 'all'):
+        report['face'] = bench_face(args.image, args.iterations)
+    if args.suite in ('intents', 'all'):
+        report['intents'] = bench_intents(args.catalogue, args.utterances, args.seed)
+    if args.suite in ('web', 'all'):
+        report['web'] = bench_web(args.endpoints, args.concurrency, args.requests, args.image, args.transactions)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
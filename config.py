@@ -1,14 +1,105 @@
 import os
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(base_dir, 'bank.db')
+    # Heroku-style URLs still use the scheme SQLAlchemy dropped
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, pool_size, max_overflow):
+    options = {'pool_pre_ping': True}
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        # wait for the write lock instead of failing with "database is locked"
+        options['connect_args'] = {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+    options['pool_size'] = pool_size
+    options['max_overflow'] = max_overflow
+    return options
+
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    # recorded queries feed the db_query histogram and the slow query log
+    SQLALCHEMY_RECORD_QUERIES = os.environ.get('RECORD_QUERIES', '0') == '1'
+    SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.5))
     AWS_REGION = os.environ.get('AWS_REGION', 'eu-central-1')
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(base_dir, 'bank.db')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=10)
+    SQLITE_WAL = True
+    SQLITE_BUSY_TIMEOUT_MS = SQLITE_BUSY_TIMEOUT_MS
+    FACE_MODEL_PRELOAD = os.environ.get('FACE_MODEL_PRELOAD', '0') == '1'
+    # 'client': the browser posts frames, 'kiosk': background capture from a local camera
+    CAMERA_MODE = os.environ.get('CAMERA_MODE', 'client')
+    CAMERA_BUFFER_SIZE = int(os.environ.get('CAMERA_BUFFER_SIZE', 4))
+    FACE_INFERENCE_WORKERS = int(os.environ.get('FACE_INFERENCE_WORKERS', 4))
+    FACE_INFERENCE_QUEUE = int(os.environ.get('FACE_INFERENCE_QUEUE', 4))
+    FACE_INFERENCE_TIMEOUT = float(os.environ.get('FACE_INFERENCE_TIMEOUT', 10))
+    # faces from concurrent requests are embedded in one forward pass of up to FACE_BATCH_SIZE
+    # (1 disables it), waiting at most FACE_BATCH_WAIT_MS for the batch to fill; a worker
+    # never has more than FACE_INFERENCE_WORKERS faces in flight
+    FACE_BATCH_SIZE = int(os.environ.get('FACE_BATCH_SIZE', 4))
+    FACE_BATCH_WAIT_MS = float(os.environ.get('FACE_BATCH_WAIT_MS', 5))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+    AUTOSAVE_FLUSH_MS = int(os.environ.get('AUTOSAVE_FLUSH_MS', 500))
+    # blurry, badly lit or faceless frames are rejected before the face model runs
+    FRAME_QUALITY_GATE = os.environ.get('FRAME_QUALITY_GATE', '1') == '1'
+    FRAME_MIN_SHARPNESS = float(os.environ.get('FRAME_MIN_SHARPNESS', 60))
+    FRAME_MIN_FACE_RATIO = float(os.environ.get('FRAME_MIN_FACE_RATIO', 0.15))
+    # /identify-face logs in the nearest of all users: stricter than the 1:1 threshold (0.593)
+    # and the runner-up must be at least FACE_IDENTIFY_MARGIN further away
+    FACE_IDENTIFY_THRESHOLD = float(os.environ.get('FACE_IDENTIFY_THRESHOLD', 0.45))
+    FACE_IDENTIFY_MARGIN = float(os.environ.get('FACE_IDENTIFY_MARGIN', 0.1))
+    # any werkzeug method string; stored hashes with other parameters are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    LOGIN_THROTTLE_WINDOW = float(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+    LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', 20))
+    LOGIN_MAX_FAILURES_PER_USERNAME = int(os.environ.get('LOGIN_MAX_FAILURES_PER_USERNAME', 5))
+    # proxies in front of the app (1 on Heroku), so remote_addr is the client, not the router
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+    # both default to on outside debug; fingerprinted assets are served from /assets
+    STATIC_FINGERPRINT = os.environ.get('STATIC_FINGERPRINT', '1') == '1'
+    PAGE_CACHE = os.environ.get('PAGE_CACHE', '1') == '1'
+
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQLALCHEMY_RECORD_QUERIES = True
+    STATIC_FINGERPRINT = False
+    PAGE_CACHE = False
+
+
+class ProductionConfig(Config):
+    # gthread workers (see Procfile) each need a connection per busy thread
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI,
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    )
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    FACE_MODEL_PRELOAD = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
 
 config = {
-    'default': Config
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+    'default': DevelopmentConfig
 }
@@ -0,0 +1,57 @@
+"""Move user photos out of the users table
+
+Revision ID: 9e4b2d61a7c3
+Revises: 5c1e8a7d2f40
+Create Date: 2025-11-16 14:03:22.519604
+
+"""
+from datetime import datetime
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b2d61a7c3'
+down_revision = '5c1e8a7d2f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    user_photos = op.create_table('user_photos',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('photo_hash', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    connection = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer()), sa.column('photo', sa.LargeBinary()))
+    rows = connection.execute(sa.select(users.c.id, users.c.photo).where(users.c.photo.isnot(None)))
+    for user_id, photo in rows:
+        connection.execute(user_photos.insert().values(
+            user_id=user_id,
+            photo_hash=hashlib.sha256(photo).hexdigest(),
+            data=photo,
+            updated_at=datetime.utcnow(),
+        ))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('photo')
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('photo', sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer()), sa.column('photo', sa.LargeBinary()))
+    user_photos = sa.table('user_photos', sa.column('user_id', sa.Integer()), sa.column('data', sa.LargeBinary()))
+    for user_id, photo in connection.execute(sa.select(user_photos.c.user_id, user_photos.c.data)).fetchall():
+        connection.execute(users.update().where(users.c.id == user_id).values(photo=photo))
+
+    op.drop_table('user_photos')
@@ -0,0 +1,46 @@
+"""Forms autosave revision
+
+Revision ID: b37f0c9e5a12
+Revises: 9e4b2d61a7c3
+Create Date: 2025-11-17 09:41:06.882310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b37f0c9e5a12'
+down_revision = '9e4b2d61a7c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # forms was created with db.create_all() and never had a migration of its own
+    if 'forms' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('forms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=True),
+        sa.Column('surname', sa.String(length=200), nullable=True),
+        sa.Column('birthday', sa.String(length=10), nullable=True),
+        sa.Column('id_number', sa.String(length=200), nullable=True),
+        sa.Column('job', sa.String(length=200), nullable=True),
+        sa.Column('income', sa.String(length=100), nullable=True),
+        sa.Column('address', sa.String(length=300), nullable=True),
+        sa.Column('phone_number', sa.String(length=50), nullable=True),
+        sa.Column('email', sa.String(length=200), nullable=True),
+        sa.Column('revision', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        return
+
+    with op.batch_alter_table('forms', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    # forms holds user drafts on every database that predates this revision, so only the
+    # column is removed; a forms table created by upgrade() is left as db.create_all() would
+    with op.batch_alter_table('forms', schema=None) as batch_op:
+        batch_op.drop_column('revision')
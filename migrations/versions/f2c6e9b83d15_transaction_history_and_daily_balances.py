@@ -0,0 +1,58 @@
+"""Transaction history index and daily balances
+
+Revision ID: f2c6e9b83d15
+Revises: d8a1f4c27b69
+Create Date: 2025-11-18 11:17:39.664208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6e9b83d15'
+down_revision = 'd8a1f4c27b69'
+branch_labels = None
+depends_on = None
+
+CREDIT_TYPES = ('deposit', 'transfer_in', 'credit')
+DEBIT_TYPES = ('withdrawal', 'transfer_out', 'payment', 'debit')
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_user_created_id', ['user_id', 'created_at', 'id'], unique=False)
+
+    daily_balances = op.create_table('daily_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('credits', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('debits', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # backfill the aggregates of existing transactions
+    transactions = sa.table('transactions',
+        sa.column('user_id', sa.Integer()),
+        sa.column('amount', sa.Numeric(10, 2)),
+        sa.column('transaction_type', sa.String(20)),
+        sa.column('created_at', sa.DateTime()),
+    )
+    day = sa.func.date(transactions.c.created_at)
+    op.execute(daily_balances.insert().from_select(
+        ['user_id', 'day', 'credits', 'debits', 'count'],
+        sa.select(
+            transactions.c.user_id,
+            day,
+            sa.func.sum(sa.case((transactions.c.transaction_type.in_(CREDIT_TYPES), transactions.c.amount), else_=0)),
+            sa.func.sum(sa.case((transactions.c.transaction_type.in_(DEBIT_TYPES), transactions.c.amount), else_=0)),
+            sa.func.count(),
+        ).where(transactions.c.created_at.isnot(None)).group_by(transactions.c.user_id, day)))
+
+
+def downgrade():
+    op.drop_table('daily_balances')
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_user_created_id')
@@ -0,0 +1,39 @@
+import pytest
+
+from app import create_app, db, autosave_buffer
+from app.models import User
+
+
+@pytest.fixture
+def app():
+    app = create_app('development', {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQLITE_WAL': False,
+        'AUTOSAVE_FLUSH_MS': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        # no background autosave flush may outlive the test
+        for timer in list(autosave_buffer.timers.values()):
+            timer.cancel()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='ada', email='ada@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
@@ -0,0 +1,130 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from whisper_endpoint.audio_protocol import (AudioFormatError, FLOAT32, HEADER, INT16, MAGIC, PayloadTooLarge,
+                                             StreamDecoder, VERSION, decode, encode, read_body)
+
+
+def tone(samples):
+    return (0.5 * np.sin(np.linspace(0, 40 * np.pi, samples))).astype(np.float32)
+
+
+def feed_all(chunks):
+    decoder = StreamDecoder()
+    return np.concatenate([decoder.feed(chunk) for chunk in chunks])
+
+
+def test_decode_round_trips_float32():
+    audio = tone(1600)
+    np.testing.assert_array_equal(decode(encode(audio, encoding=FLOAT32), 10), audio)
+
+
+def test_decode_round_trips_int16_within_quantisation():
+    audio = tone(1600)
+    np.testing.assert_allclose(decode(encode(audio), 10), audio, atol=1 / 16384)
+
+
+def test_decode_downmixes_stereo():
+    left = tone(800)
+    decoded = decode(encode(np.stack([left, -left], axis=1), encoding=FLOAT32), 10)
+    np.testing.assert_allclose(decoded, np.zeros(800), atol=1e-7)
+
+
+def test_decode_reads_headerless_bodies_as_raw_float32():
+    audio = tone(400)
+    np.testing.assert_array_equal(decode(audio.tobytes(), 10), audio)
+
+
+def test_decode_rejects_raw_bodies_of_odd_length():
+    with pytest.raises(AudioFormatError):
+        decode(tone(400).tobytes()[:-1], 10)
+
+
+def test_decode_rejects_oversized_declared_frames_before_reading_them():
+    # the header claims an hour of audio, the body carries none of it
+    header = HEADER.pack(MAGIC, VERSION, INT16, 1, 16000, 16000 * 3600)
+    with pytest.raises(PayloadTooLarge):
+        decode(header, 60)
+
+
+def test_decode_rejects_payloads_that_do_not_match_the_header():
+    with pytest.raises(AudioFormatError):
+        decode(encode(tone(400))[:-2], 10)
+
+
+def test_decode_rejects_truncated_headers():
+    with pytest.raises(AudioFormatError):
+        decode(encode(tone(400))[:HEADER.size - 1], 10)
+
+
+@pytest.mark.parametrize('version, encoding', [(9, INT16), (VERSION, 7)])
+def test_decode_rejects_unknown_versions_and_encodings(version, encoding):
+    body = HEADER.pack(MAGIC, version, encoding, 1, 16000, 0)
+    with pytest.raises(AudioFormatError):
+        decode(body, 10)
+
+
+def test_stream_decoder_waits_for_a_header_split_across_chunks():
+    body = encode(tone(800))
+    decoder = StreamDecoder()
+    for i in range(HEADER.size - 1):
+        assert len(decoder.feed(body[i:i + 1])) == 0
+    rest = decoder.feed(body[HEADER.size - 1:])
+    np.testing.assert_array_equal(rest, decode(body, 10))
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1001])
+def test_stream_decoder_carries_odd_byte_counts_over(size):
+    body = encode(tone(800))
+    chunks = [body[i:i + size] for i in range(0, len(body), size)]
+    np.testing.assert_array_equal(feed_all(chunks), decode(body, 10))
+
+
+def test_stream_decoder_keeps_stereo_frames_whole():
+    audio = np.stack([tone(300), tone(300)], axis=1)
+    body = encode(audio, encoding=FLOAT32)
+    # 6-byte chunks never line up with the 8-byte stereo frames
+    chunks = [body[i:i + 6] for i in range(0, len(body), 6)]
+    np.testing.assert_allclose(feed_all(chunks), decode(body, 10))
+
+
+def test_stream_decoder_reads_headerless_streams_as_raw_float32():
+    audio = tone(500)
+    body = audio.tobytes()
+    chunks = [body[i:i + 5] for i in range(0, len(body), 5)]
+    np.testing.assert_array_equal(feed_all(chunks), audio)
+
+
+def test_stream_decoder_rejects_a_bad_header():
+    body = HEADER.pack(MAGIC, 9, INT16, 1, 16000, 10) + bytes(20)
+    decoder = StreamDecoder()
+    decoder.feed(body[:10])
+    with pytest.raises(AudioFormatError):
+        decoder.feed(body[10:])
+
+
+class FakeRequest:
+    def __init__(self, body, content_length):
+        self.headers = {} if content_length is None else {"content-length": content_length}
+        self.body = body
+
+    async def stream(self):
+        yield self.body
+
+
+@pytest.mark.parametrize('content_length', ['abc', '12.5', '', '-1'])
+def test_read_body_rejects_a_malformed_content_length(content_length):
+    with pytest.raises(AudioFormatError):
+        asyncio.run(read_body(FakeRequest(b'1234', content_length), 100))
+
+
+def test_read_body_rejects_a_declared_length_over_the_limit():
+    with pytest.raises(PayloadTooLarge):
+        asyncio.run(read_body(FakeRequest(b'', '101'), 100))
+
+
+@pytest.mark.parametrize('content_length', ['4', None])
+def test_read_body_returns_the_body(content_length):
+    assert asyncio.run(read_body(FakeRequest(b'1234', content_length), 100)) == b'1234'
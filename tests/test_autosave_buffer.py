@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy.exc import ProgrammingError
+
+from app.AutosaveBuffer import AutosaveBuffer
+from app.models import Forms
+
+
+class RecordingBuffer(AutosaveBuffer):
+    # writes go to a list instead of the database
+
+    def __init__(self, flush_interval_ms=60000):
+        super().__init__(flush_interval_ms)
+        self.writes = []
+        self.fail = 0
+        self.during_write = None
+
+    def _write(self, key, fields, revision):
+        if self.during_write:
+            self.during_write, during_write = None, self.during_write
+            during_write()
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('database is locked')
+        if any(isinstance(value, dict) for value in fields.values()):
+            raise ProgrammingError('UPDATE forms', {}, Exception('Error binding parameter'))
+        self.writes.append((key, dict(fields), revision))
+
+
+@pytest.fixture
+def buffer():
+    buffer = RecordingBuffer()
+    yield buffer
+    # no background flush may outlive the test
+    for timer in list(buffer.timers.values()):
+        timer.cancel()
+
+
+def test_first_save_is_written_immediately(buffer):
+    assert buffer.save(1, {'name': 'Ada'}, 1) == 'saved'
+    assert buffer.writes == [(1, {'name': 'Ada'}, 1)]
+
+
+@pytest.mark.parametrize('revision', [1, 2])
+def test_old_and_repeated_revisions_are_stale(buffer, revision):
+    buffer.save(1, {'name': 'Ada'}, 2)
+    assert buffer.save(1, {'name': 'Old'}, revision) == 'stale'
+    assert buffer.writes == [(1, {'name': 'Ada'}, 2)]
+
+
+def test_revisions_are_tracked_per_form(buffer):
+    buffer.save(1, {'name': 'Ada'}, 5)
+    assert buffer.save(2, {'name': 'Grace'}, 1) == 'saved'
+
+
+def test_saves_within_the_interval_are_merged(buffer):
+    buffer.save(1, {'name': 'Ada'}, 1)
+    assert buffer.save(1, {'name': 'Ada L', 'job': 'x'}, 2) == 'buffered'
+    assert buffer.save(1, {'job': 'analyst'}, 3) == 'buffered'
+    assert len(buffer.writes) == 1
+
+    buffer.flush(1)
+    assert buffer.writes[-1] == (1, {'name': 'Ada L', 'job': 'analyst'}, 3)
+
+
+def test_a_bad_payload_does_not_burn_the_revision(buffer):
+    with pytest.raises(TypeError):
+        buffer.save(1, None, 1)
+    assert buffer.save(1, {'name': 'Ada'}, 1) == 'saved'
+
+
+def test_failed_write_is_kept_and_retried(buffer):
+    buffer.fail = 1
+    assert buffer.save(1, {'name': 'Ada'}, 1) == 'buffered'
+    assert buffer.writes == []
+    assert buffer.failures == {1: 1}
+    assert 1 in buffer.timers
+
+    buffer.flush(1)
+    assert buffer.writes == [(1, {'name': 'Ada'}, 1)]
+    assert buffer.failures == {}
+
+
+def test_saves_after_a_failure_wait_for_the_retry(buffer):
+    buffer.fail = 1
+    buffer.save(1, {'name': 'Ada', 'job': 'x'}, 1)
+    assert buffer.save(1, {'name': 'Ada L'}, 2) == 'buffered'
+
+    buffer.flush(1)
+    assert buffer.writes == [(1, {'name': 'Ada L', 'job': 'x'}, 2)]
+
+
+def test_fields_saved_during_a_failed_write_win_over_it(buffer):
+    buffer.fail = 1
+    buffer.during_write = lambda: buffer.save(1, {'name': 'New'}, 2)
+    assert buffer.save(1, {'name': 'Old', 'job': 'x'}, 1) == 'buffered'
+
+    buffer.flush(1)
+    assert buffer.writes == [(1, {'name': 'New', 'job': 'x'}, 2)]
+
+
+def test_discard_drops_pending_fields_and_revisions(buffer):
+    buffer.save(1, {'name': 'Ada'}, 1)
+    buffer.save(1, {'name': 'Ada L'}, 2)
+    buffer.discard(1)
+
+    buffer.flush(1)
+    assert buffer.writes == [(1, {'name': 'Ada'}, 1)]
+    assert buffer.timers == {}
+    assert buffer.save(1, {'name': 'Ada'}, 1) == 'buffered'
+
+
+def test_a_rejected_write_is_dropped_not_retried(buffer):
+    assert buffer.save(1, {'name': {'x': 1}}, 1) == 'rejected'
+    assert buffer.failures == {}
+    assert buffer.timers == {}
+    assert buffer.pending == {}
+
+    buffer.last_flush.clear()
+    assert buffer.save(1, {'name': 'Ada'}, 2) == 'saved'
+    assert buffer.writes == [(1, {'name': 'Ada'}, 2)]
+
+
+@pytest.mark.parametrize('fields, invalid', [
+    ({'name': 'Ada', 'job': None}, None),
+    ({'name': {'x': 1}}, 'name'),
+    ({'income': 5}, 'income'),
+    ({'birthday': '2000-01-01T00'}, 'birthday'),
+])
+def test_forms_reject_values_the_columns_cannot_store(fields, invalid):
+    assert Forms.invalid_field(fields) == invalid
+
+
+def test_an_unbindable_revision_is_dropped_and_does_not_block_later_saves(buffer):
+    def overflow(key, fields, revision):
+        raise OverflowError('Python int too large to convert to SQLite INTEGER')
+
+    buffer._write, write = overflow, buffer._write
+    assert buffer.save(1, {'name': 'Ada'}, 2 ** 70) == 'rejected'
+    assert buffer.timers == {}
+
+    buffer._write = write
+    buffer.last_flush.clear()
+    assert buffer.save(1, {'name': 'Ada'}, 1) == 'saved'
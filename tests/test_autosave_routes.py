@@ -0,0 +1,30 @@
+import pytest
+
+from app import autosave_buffer
+from app.models import Forms
+
+
+@pytest.fixture(autouse=True)
+def fresh_buffer(user):
+    yield
+    autosave_buffer.discard(user.id)
+
+
+@pytest.mark.parametrize('revision', [2 ** 70, 2 ** 31, -1, True, '1', None])
+def test_out_of_range_revisions_are_rejected(client, revision):
+    response = client.post('/autosave', json={'revision': revision, 'fields': {'name': 'Ada'}})
+    assert response.status_code == 400
+
+    assert client.post('/autosave', json={'revision': 1, 'fields': {'name': 'Ada'}}).get_json()['status'] == 'saved'
+    assert client.get('/load').get_json()['name'] == 'Ada'
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'fields', 3])
+def test_a_body_that_is_not_an_object_is_rejected(client, body):
+    assert client.post('/autosave', json=body).status_code == 400
+
+
+def test_non_string_fields_are_rejected(client):
+    response = client.post('/autosave', json={'revision': 1, 'fields': {'name': {'x': 1}}})
+    assert response.status_code == 400
+    assert Forms.query.count() == 0
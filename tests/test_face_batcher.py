@@ -0,0 +1,67 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from app.FaceBatcher import FaceBatcher
+from app.FaceRecognition import FaceRecognition
+
+
+def test_concurrent_faces_share_one_call_and_get_their_own_result():
+    calls = []
+    release = threading.Event()
+
+    def embed_batch(faces):
+        release.wait(5)
+        calls.append(len(faces))
+        return faces.reshape(len(faces), -1) * 2
+
+    batcher = FaceBatcher(embed_batch, max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(np.full((1, 2), i, dtype=np.float32)) for i in range(3)]
+    release.set()
+
+    assert [future.result(timeout=5).tolist() for future in futures] == [[0, 0], [2, 2], [4, 4]]
+    assert calls == [3]
+    assert batcher.stats()['batch_sizes'] == {'3': 1}
+    assert batcher.stats()['mean_batch_size'] == 3.0
+
+
+def test_batches_stop_at_the_max_size():
+    batcher = FaceBatcher(lambda faces: faces, max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit(np.zeros((1, 2))) for _ in range(3)]
+    for future in futures:
+        future.result(timeout=5)
+    assert batcher.stats()['batch_sizes'] == {'1': 1, '2': 1}
+
+
+def test_a_failed_batch_fails_every_face_in_it():
+    def embed_batch(faces):
+        raise RuntimeError('forward failed')
+
+    batcher = FaceBatcher(embed_batch, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.embed(np.zeros((1, 2)), timeout=5)
+
+
+class RecordingNet:
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        return np.ones((self.blob.shape[0], 128), dtype=np.float32)
+
+
+def test_embed_batch_builds_the_blob_feature_builds_for_each_face():
+    face_recognition = FaceRecognition()
+    face_recognition.batch_net = net = RecordingNet()
+    faces = np.random.default_rng(0).random((3, 112, 112, 3), dtype=np.float32)
+
+    embeddings = face_recognition.embed_batch(faces)
+
+    # FaceRecognizerSF.feature() on one uint8 BGR face
+    expected = [cv2.dnn.blobFromImage((face * 255).astype(np.uint8), 1, (112, 112), (0, 0, 0), True, False)
+                for face in faces]
+    np.testing.assert_array_equal(net.blob, np.concatenate(expected))
+    assert embeddings.shape == (3, 128)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.FaceIndex import FaceIndex
+from app.models import User, FaceEmbedding
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def unit(seed):
+    vector = np.random.default_rng(seed).random(128, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def store(user_id, vector, updated_at):
+    embedding = db.session.get(FaceEmbedding, user_id) or FaceEmbedding(user_id=user_id, model_name='SFace',
+                                                                       photo_hash='x')
+    embedding.set_vector(vector)
+    embedding.updated_at = updated_at
+    db.session.add(embedding)
+    db.session.commit()
+
+
+def test_a_change_committed_after_a_later_stamp_is_still_loaded(app):
+    users = [User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('ada', 'grace')]
+    db.session.add_all(users)
+    db.session.commit()
+    ada, grace = (user.id for user in users)
+
+    store(ada, unit(1), NOW)
+    store(grace, unit(2), NOW + timedelta(seconds=2))
+    index = FaceIndex()
+    index.sync('SFace')
+
+    # flushed before grace's row but committed after the sync
+    store(ada, unit(3), NOW + timedelta(seconds=1))
+    index.sync('SFace')
+
+    user_id, distance = index.search(unit(3))[0]
+    assert user_id == ada
+    assert distance < 1e-5
+
+
+def test_rows_older_than_the_overlap_are_not_reloaded(app):
+    user = User(username='ada', email='ada@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    store(user.id, unit(1), NOW)
+
+    index = FaceIndex()
+    index.sync('SFace')
+    index.synced_at = NOW + FaceIndex.SYNC_OVERLAP + timedelta(seconds=1)
+    loaded = []
+    index.upsert = lambda user_id, vector: loaded.append(user_id)
+    index.sync('SFace')
+    assert loaded == []
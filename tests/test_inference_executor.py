@@ -0,0 +1,82 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.InferenceExecutor import InferenceExecutor, InferenceBusy
+
+
+def make_executor(initializer=None, workers=3, queue_size=1):
+    app = SimpleNamespace(config={'FACE_INFERENCE_WORKERS': workers, 'FACE_INFERENCE_QUEUE': queue_size,
+                                  'FACE_INFERENCE_TIMEOUT': 5}, extensions={})
+    executor = InferenceExecutor()
+    executor.init_app(app, initializer=initializer)
+    return executor
+
+
+def test_every_thread_is_warmed_before_it_is_ready():
+    warmed = []
+    release = threading.Event()
+
+    def initializer():
+        release.wait(5)
+        warmed.append(threading.current_thread().name)
+
+    executor = make_executor(initializer)
+    executor.start()
+    assert not executor.ready
+
+    release.set()
+    assert executor.run(lambda: 'done') == 'done'
+    assert executor.ready
+    assert len(set(warmed)) == 3
+    executor.executor.shutdown()
+
+
+def test_start_is_once_per_process():
+    executor = make_executor()
+    executor.start()
+    pool = executor.executor
+    executor.start()
+    executor.run(lambda: None)
+    assert executor.executor is pool
+    pool.shutdown()
+
+
+def test_a_failing_initializer_does_not_hang_the_pool():
+    def initializer():
+        raise RuntimeError('no weights')
+
+    executor = make_executor(initializer)
+    executor.start()
+    executor.executor.shutdown(wait=True)
+    assert not executor.ready
+
+
+def test_jobs_beyond_the_queue_are_rejected():
+    release = threading.Event()
+    executor = make_executor(workers=1, queue_size=1)
+    futures = [executor.submit(release.wait, 5) for _ in range(2)]
+    with pytest.raises(InferenceBusy):
+        executor.submit(release.wait, 5)
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    executor.executor.shutdown()
+
+
+def test_a_pool_broken_by_its_initializer_is_rebuilt_on_the_next_call():
+    failures = [RuntimeError('weights download failed')]
+
+    def initializer():
+        if failures:
+            raise failures.pop()
+
+    executor = make_executor(initializer, workers=1)
+    with pytest.raises(InferenceBusy):
+        executor.run(lambda: 'done')
+    assert not executor.ready
+
+    assert executor.run(lambda: 'done') == 'done'
+    assert executor.ready
+    executor.executor.shutdown()
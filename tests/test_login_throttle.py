@@ -0,0 +1,92 @@
+import sys
+
+import pytest
+
+from app.LoginThrottle import LoginThrottle
+
+# app/__init__ rebinds app.LoginThrottle to the class, so reach the module directly
+login_throttle_module = sys.modules['app.LoginThrottle']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(login_throttle_module.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def throttle():
+    throttle = LoginThrottle()
+    throttle.window = 300.0
+    throttle.max_per_ip = 4
+    throttle.max_per_username = 2
+    return throttle
+
+
+def test_allows_attempts_below_the_limit(clock, throttle):
+    throttle.failed('10.0.0.1', 'ada')
+    assert throttle.retry_after('10.0.0.1', 'ada') == 0
+
+
+def test_blocks_a_username_until_the_window_has_passed(clock, throttle):
+    throttle.failed('10.0.0.1', 'ada')
+    clock.now += 100
+    throttle.failed('10.0.0.2', 'Ada')
+    # the oldest failure is 100 s old, so it expires in 200 s
+    assert throttle.retry_after('10.0.0.3', 'ADA') == 201
+
+    clock.now += 199
+    assert throttle.retry_after('10.0.0.3', 'ada') > 0
+    clock.now += 1
+    assert throttle.retry_after('10.0.0.3', 'ada') == 0
+
+
+def test_failures_expire_one_at_a_time(clock, throttle):
+    throttle.failed('10.0.0.1', 'ada')
+    clock.now += 100
+    throttle.failed('10.0.0.1', 'ada')
+    clock.now += 200
+    throttle.failed('10.0.0.1', 'ada')
+    # the first failure has left the window, the other two still block
+    assert throttle.retry_after('10.0.0.1', 'ada') == 101
+
+
+def test_blocks_an_ip_across_usernames(clock, throttle):
+    for username in ('a', 'b', 'c', 'd'):
+        throttle.failed('10.0.0.1', username)
+    assert throttle.retry_after('10.0.0.1', 'e') > 0
+    assert throttle.retry_after('10.0.0.1') > 0
+    assert throttle.retry_after('10.0.0.2', 'e') == 0
+
+
+def test_face_attempts_only_count_against_the_ip(clock, throttle):
+    for _ in range(4):
+        throttle.failed('10.0.0.1')
+    assert throttle.retry_after('10.0.0.1') > 0
+    assert ('user', 'ada') not in throttle.failures
+
+
+def test_success_clears_the_username_but_not_the_ip(clock, throttle):
+    for _ in range(2):
+        throttle.failed('10.0.0.1', 'ada')
+    throttle.succeeded('Ada')
+    assert throttle.retry_after('10.0.0.2', 'ada') == 0
+    assert len(throttle.failures[('ip', '10.0.0.1')]) == 2
+
+
+def test_expired_keys_are_pruned_when_the_table_is_full(clock, throttle):
+    throttle.max_keys = 4
+    throttle.failed('10.0.0.1', 'ada')
+    throttle.failed('10.0.0.2', 'bob')
+    clock.now += 301
+    throttle.failed('10.0.0.3', 'eve')
+    assert set(throttle.failures) == {('ip', '10.0.0.3'), ('user', 'eve')}
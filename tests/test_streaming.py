@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import json
+import numpy as np
+import pytest
+
+from whisper_endpoint import streaming
+from whisper_endpoint.audio_protocol import encode
+from whisper_endpoint.streaming import BodyStreamingResponse, RequestBody, intent_events
+
+
+@pytest.fixture(autouse=True)
+def no_stage_metrics(monkeypatch):
+    # the stage histogram lives in Ray, which the tests do not start
+    monkeypatch.setattr(streaming, 'timed', lambda stage: contextlib.nullcontext())
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def post(chunks, transcribe, match):
+    # drives the response like an ASGI server: one http.request message per chunk,
+    # then nothing until the response is done
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if messages:
+            await asyncio.sleep(0)
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        body = RequestBody(receive)
+        events = intent_events(body, transcribe, match, 60, step_samples=4000, window_samples=16000,
+                               silence_rms=0.001)
+        response = BodyStreamingResponse(body, events, media_type='application/x-ndjson')
+        await response({'type': 'http', 'method': 'POST', 'path': '/stream', 'headers': []}, receive, send)
+
+    asyncio.run(run())
+    assert sent[0]['status'] == 200
+    text = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+    return [json.loads(line) for line in text.decode().splitlines()]
+
+
+def tone(seconds):
+    t = np.arange(int(seconds * 16000)) / 16000
+    return (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+async def transcribe(audio):
+    return f'heard {len(audio)}'
+
+
+def test_partial_events_arrive_per_step_then_the_intent():
+    calls = []
+
+    async def match(text):
+        calls.append(text)
+        return ('#card', 0.9 if len(calls) == 3 else 0.1)
+
+    # 3001-byte chunks split the 16-byte header and leave odd int16 byte counts behind
+    events = post(chunked(encode(tone(1.0)), 3001), transcribe, match)
+
+    partials = [event['partial'] for event in events if 'partial' in event]
+    assert len(partials) == 3
+    assert partials == sorted(partials, key=lambda text: int(text.split()[1]))
+    assert events[-1] == {'intent': '#card', 'score': 0.9, 'text': partials[-1]}
+
+
+def test_body_end_emits_a_final_event():
+    async def match(text):
+        return ('#card', 0.1)
+
+    events = post(chunked(encode(tone(0.5)), 1000), transcribe, match)
+
+    assert [event for event in events if 'partial' in event]
+    assert events[-1]['final'] is True
+    assert events[-1]['text'] == 'heard 8000'
+
+
+def test_bad_header_is_reported_as_an_event():
+    async def fail(_):
+        raise AssertionError('nothing should be transcribed')
+
+    body = bytearray(encode(tone(0.1)))
+    body[4] = 9
+    events = post(chunked(bytes(body), 7), fail, fail)
+
+    assert events == [{'error': 'unsupported audio version 9'}]
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Transaction, DailyBalance
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def add(user, amount, created_at, transaction_type='deposit'):
+    transaction = Transaction(user_id=user.id, amount=Decimal(amount), transaction_type=transaction_type,
+                              created_at=created_at)
+    db.session.add(transaction)
+    db.session.commit()
+    return transaction
+
+
+def daily(user):
+    return {row.day: (row.credits, row.debits, row.count)
+            for row in DailyBalance.query.filter_by(user_id=user.id)}
+
+
+def test_insert_builds_the_day(user):
+    add(user, '5.00', NOW)
+    add(user, '2.00', NOW, 'withdrawal')
+    assert daily(user) == {NOW.date(): (Decimal('5.00'), Decimal('2.00'), 2)}
+    assert DailyBalance.balance(user.id) == Decimal('3.00')
+
+
+def test_moving_a_transaction_rebuilds_the_old_day(user):
+    transaction = add(user, '5.00', NOW)
+    transaction.created_at = NOW - timedelta(days=3)
+    db.session.commit()
+
+    assert daily(user) == {(NOW - timedelta(days=3)).date(): (Decimal('5.00'), Decimal('0.00'), 1)}
+    assert DailyBalance.balance(user.id) == Decimal('5.00')
+
+
+def test_moving_a_transaction_to_another_user_rebuilds_both(user):
+    other = type(user)(username='grace', email='grace@example.com', password_hash='x')
+    db.session.add(other)
+    transaction = add(user, '5.00', NOW)
+    transaction.user_id = other.id
+    db.session.commit()
+
+    assert DailyBalance.balance(user.id) == 0
+    assert DailyBalance.balance(other.id) == Decimal('5.00')
+
+
+def test_delete_empties_the_day(user):
+    transaction = add(user, '5.00', NOW)
+    transaction.created_at = NOW - timedelta(days=3)
+    db.session.commit()
+    db.session.delete(transaction)
+    db.session.commit()
+
+    assert daily(user) == {}
+    assert DailyBalance.balance(user.id) == 0
+
+
+def page(client, **params):
+    response = client.get('/api/transactions', query_string=params)
+    return response.status_code, response.get_json()
+
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats(client, user):
+    # two rows share a timestamp, so the id breaks the tie
+    ids = [add(user, '1.00', NOW - timedelta(minutes=minutes)).id for minutes in (0, 1, 1, 2, 3)]
+
+    seen, cursor = [], None
+    while True:
+        status, data = page(client, limit=2, **({'cursor': cursor} if cursor else {}))
+        assert status == 200
+        seen += [row['id'] for row in data['transactions']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [ids[0], ids[2], ids[1], ids[3], ids[4]]
+
+
+@pytest.mark.parametrize('limit', [0, -5])
+def test_a_limit_below_one_returns_one_row(client, user, limit):
+    add(user, '1.00', NOW)
+    add(user, '1.00', NOW - timedelta(minutes=1))
+    status, data = page(client, limit=limit)
+    assert status == 200
+    assert len(data['transactions']) == 1
+    assert data['next_cursor']
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'not-a-date,1', '2026-03-10T12:00:00,abc'])
+def test_a_bad_cursor_is_rejected(client, cursor):
+    status, data = page(client, cursor=cursor)
+    assert status == 400
+    assert data['message'] == 'invalid cursor'
@@ -0,0 +1,71 @@
+from decimal import Decimal
+import pytest
+
+from app.TransactionImporter import TransactionImporter, InvalidRow
+
+
+@pytest.fixture
+def importer():
+    return TransactionImporter(user_id=1)
+
+
+def test_validate_accepts_a_valid_row(importer):
+    row = importer.validate({'amount': '12.50', 'transaction_type': 'Deposit',
+                             'created_at': '2025-01-02T03:04:05'}, 1)
+    assert row['user_id'] == 1
+    assert row['amount'] == Decimal('12.50')
+    assert row['transaction_type'] == 'deposit'
+    assert row['created_at'].year == 2025
+
+
+@pytest.mark.parametrize('amount', ['Infinity', '-Infinity', 'NaN', 'sNaN', '1e30', '100000000',
+                                    '0', '-5', '1.001', 'abc', ''])
+def test_validate_rejects_bad_amounts(importer, amount):
+    with pytest.raises(InvalidRow):
+        importer.validate({'amount': amount, 'transaction_type': 'deposit'}, 1)
+
+
+@pytest.mark.parametrize('record', [None, [], {'transaction_type': 'deposit'},
+                                    {'amount': '1', 'transaction_type': 'gift'},
+                                    {'amount': '1', 'transaction_type': 'deposit', 'created_at': 'yesterday'}])
+def test_validate_rejects_bad_records(importer, record):
+    with pytest.raises(InvalidRow):
+        importer.validate(record, 1)
+
+
+def test_validate_requires_user_id_without_a_fixed_user():
+    with pytest.raises(InvalidRow):
+        TransactionImporter().validate({'amount': '1', 'transaction_type': 'deposit'}, 1)
+
+
+def test_rows_skips_invalid_rows_when_asked():
+    importer = TransactionImporter(user_id=1, skip_invalid=True)
+    records = [{'amount': 'sNaN', 'transaction_type': 'deposit'}, {'amount': '2', 'transaction_type': 'debit'}]
+    rows = list(importer.rows(records))
+    assert [row['amount'] for row in rows] == [Decimal('2')]
+    assert importer.invalid == 1
+    assert importer.errors[0].startswith('row 1:')
+
+
+def test_rows_stops_at_the_first_invalid_row():
+    importer = TransactionImporter(user_id=1)
+    with pytest.raises(InvalidRow):
+        list(importer.rows([{'amount': 'Infinity', 'transaction_type': 'deposit'}]))
+
+
+@pytest.mark.parametrize('description', [{'a': 1}, ['a'], 5])
+def test_validate_rejects_non_string_descriptions(importer, description):
+    with pytest.raises(InvalidRow):
+        importer.validate({'amount': '1', 'transaction_type': 'deposit', 'description': description}, 1)
+
+
+@pytest.mark.parametrize('user_id', [0, -1, 2 ** 31, 2 ** 70, 1.5, True, '1.5', 'abc', '²', {'id': 1}, None])
+def test_validate_rejects_bad_user_ids(user_id):
+    with pytest.raises(InvalidRow):
+        TransactionImporter().validate({'amount': '1', 'transaction_type': 'deposit', 'user_id': user_id}, 1)
+
+
+@pytest.mark.parametrize('user_id', [7, '7', ' 7 '])
+def test_validate_accepts_user_ids_from_csv_and_jsonl(user_id):
+    row = TransactionImporter().validate({'amount': '1', 'transaction_type': 'deposit', 'user_id': user_id}, 1)
+    assert row['user_id'] == 7
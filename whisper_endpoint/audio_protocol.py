@@ -0,0 +1,137 @@
+"""Framed audio format accepted by the voice endpoint.
+
+A body starts with a 16-byte little-endian header followed by interleaved samples:
+
+    magic       4s   b"BOAU"
+    version     u8   1
+    encoding    u8   1 = int16 PCM, 2 = float32
+    channels    u16
+    sample_rate u32
+    frames      u32  samples per channel
+
+Bodies without the magic are read as the legacy raw 16 kHz mono float32 stream.
+"""
+import struct
+import numpy as np
+
+MAGIC = b"BOAU"
+VERSION = 1
+INT16 = 1
+FLOAT32 = 2
+HEADER = struct.Struct("<4sBBHII")
+DTYPES = {INT16: np.dtype("<i2"), FLOAT32: np.dtype("<f4")}
+TARGET_RATE = 16000
+
+
+class AudioFormatError(ValueError):
+    status_code = 400
+
+
+class PayloadTooLarge(AudioFormatError):
+    status_code = 413
+
+
+def encode(audio, sample_rate=TARGET_RATE, encoding=INT16):
+    audio = np.asarray(audio, dtype=np.float32)
+    channels = 1 if audio.ndim == 1 else audio.shape[1]
+    if encoding == INT16:
+        samples = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    else:
+        samples = audio.astype("<f4")
+    frames = len(audio)
+    return HEADER.pack(MAGIC, VERSION, encoding, channels, sample_rate, frames) + samples.tobytes()
+
+
+def parse_header(body):
+    magic, version, encoding, channels, sample_rate, frames = HEADER.unpack_from(body)
+    if version != VERSION:
+        raise AudioFormatError(f"unsupported audio version {version}")
+    if encoding not in DTYPES:
+        raise AudioFormatError(f"unsupported audio encoding {encoding}")
+    if not 1 <= channels <= 8 or not 8000 <= sample_rate <= 192000:
+        raise AudioFormatError("invalid channel count or sample rate")
+    return encoding, channels, sample_rate, frames
+
+
+def to_float(samples, encoding, channels, sample_rate):
+    # float32 mono payloads at 16 kHz come out as a view of the request buffer
+    if encoding == INT16:
+        audio = samples.astype(np.float32)
+        audio *= 1.0 / 32768.0
+    else:
+        audio = samples
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    if sample_rate != TARGET_RATE:
+        import librosa
+        audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=TARGET_RATE).astype(np.float32)
+    return audio
+
+
+def decode(body, max_seconds):
+    if not body.startswith(MAGIC):
+        if len(body) % 4:
+            raise AudioFormatError("raw float32 body length is not a multiple of 4")
+        if len(body) // 4 > max_seconds * TARGET_RATE:
+            raise PayloadTooLarge(f"audio longer than {max_seconds} s")
+        return np.frombuffer(body, np.float32)
+
+    if len(body) < HEADER.size:
+        raise AudioFormatError("truncated audio header")
+    encoding, channels, sample_rate, frames = parse_header(body)
+    # check the declared size before anything is allocated for it
+    if frames > max_seconds * sample_rate:
+        raise PayloadTooLarge(f"audio longer than {max_seconds} s")
+    dtype = DTYPES[encoding]
+    if len(body) - HEADER.size != frames * channels * dtype.itemsize:
+        raise AudioFormatError("audio payload does not match the header")
+
+    samples = np.frombuffer(body, dtype, count=frames * channels, offset=HEADER.size)
+    return to_float(samples, encoding, channels, sample_rate)
+
+
+async def read_body(request, max_bytes):
+    length = request.headers.get("content-length")
+    if length is not None:
+        length = int(length) if length.isdecimal() else -1
+        if length < 0:
+            raise AudioFormatError("malformed Content-Length")
+        if length > max_bytes:
+            raise PayloadTooLarge(f"body larger than {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise PayloadTooLarge(f"body larger than {max_bytes} bytes")
+    return bytes(body)
+
+
+class StreamDecoder:
+    # Incremental decoder for chunked uploads: reads an optional header from the
+    # first bytes, then turns each chunk into 16 kHz mono float32 samples.
+
+    def __init__(self):
+        self.pending = b""
+        self.format = None
+
+    def feed(self, chunk):
+        data = self.pending + chunk
+        if self.format is None:
+            if len(data) < len(MAGIC) or (data.startswith(MAGIC) and len(data) < HEADER.size):
+                self.pending = data
+                return np.empty(0, np.float32)
+            if data.startswith(MAGIC):
+                encoding, channels, sample_rate, _ = parse_header(data)
+                self.format = (encoding, channels, sample_rate)
+                data = data[HEADER.size:]
+            else:
+                self.format = (FLOAT32, 1, TARGET_RATE)
+
+        encoding, channels, sample_rate = self.format
+        frame_size = DTYPES[encoding].itemsize * channels
+        usable = len(data) - len(data) % frame_size
+        self.pending = data[usable:]
+        if not usable:
+            return np.empty(0, np.float32)
+        samples = np.frombuffer(data, DTYPES[encoding], count=usable // DTYPES[encoding].itemsize)
+        return to_float(samples, encoding, channels, sample_rate)
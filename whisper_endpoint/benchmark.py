@@ -0,0 +1,103 @@
+"""Offline benchmark of Whisper engine configurations.
+
+The corpus is a directory of audio files, each with a reference transcript next
+to it (sample.wav + sample.txt). For every configuration it reports the
+real-time factor (processing time / audio duration, lower is faster) and the
+word error rate against the references.
+
+    python -m whisper_endpoint.benchmark corpus/ -c torch:base:float32 -c torch:base:int8 \\
+        -c faster-whisper:base:int8 --threads 4 --json results.json
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+
+from whisper_endpoint import engines
+from whisper_endpoint.cache import normalize_text
+
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".m4a", ".ogg")
+
+
+def load_corpus(directory):
+    import librosa
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        stem, extension = os.path.splitext(path)
+        if extension.lower() not in AUDIO_EXTENSIONS or not os.path.exists(stem + ".txt"):
+            continue
+        audio, _ = librosa.load(path, sr=SAMPLE_RATE, mono=True)
+        with open(stem + ".txt", encoding="utf-8") as file:
+            corpus.append((os.path.basename(path), audio.astype(np.float32), file.read()))
+    return corpus
+
+
+def word_errors(reference, hypothesis):
+    # word-level Levenshtein distance
+    reference, hypothesis = normalize_text(reference).split(), normalize_text(hypothesis).split()
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(reference)
+
+
+def run(config, corpus, threads):
+    backend, model_size, compute_type = config.split(":")
+    start = time.perf_counter()
+    model = engines.load_model(backend, model_size, compute_type, threads)
+    load_seconds = time.perf_counter() - start
+    engines.transcribe(model, corpus[0][1][:SAMPLE_RATE])
+
+    processing = duration = errors = words = 0
+    for name, audio, reference in corpus:
+        start = time.perf_counter()
+        text = engines.transcribe(model, audio).text
+        processing += time.perf_counter() - start
+        duration += len(audio) / SAMPLE_RATE
+        file_errors, file_words = word_errors(reference, text)
+        errors += file_errors
+        words += file_words
+
+    return {
+        "config": config,
+        "threads": threads,
+        "load_s": round(load_seconds, 3),
+        "audio_s": round(duration, 3),
+        "processing_s": round(processing, 3),
+        "rtf": round(processing / duration, 4) if duration else None,
+        "wer": round(errors / words, 4) if words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="directory of audio files with matching .txt references")
+    parser.add_argument("-c", "--config", action="append", dest="configs",
+                        help="backend:model:compute_type, repeatable (default torch:base:float32)")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"no audio files with .txt references in {args.corpus}")
+
+    results = []
+    for config in args.configs or ["torch:base:float32"]:
+        result = run(config, corpus, args.threads)
+        print(json.dumps(result))
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import stable_whisper
+import whisper
+import torch
+
+BACKENDS = ("torch", "faster-whisper")
+COMPUTE_TYPES = ("float32", "int8")
+
+
+def load_model(backend="torch", model_size="base", compute_type="float32", threads=1):
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown whisper backend '{backend}', expected one of {BACKENDS}")
+    if compute_type not in COMPUTE_TYPES:
+        raise ValueError(f"unknown compute type '{compute_type}', expected one of {COMPUTE_TYPES}")
+
+    if backend == "faster-whisper":
+        # CTranslate2 runs its own int8/float32 kernels and thread pool
+        return stable_whisper.load_faster_whisper(model_size, device="cpu", compute_type=compute_type,
+                                                  cpu_threads=threads)
+
+    torch.set_num_threads(threads)
+    model = stable_whisper.load_model(model_size, device="cpu")
+    if compute_type == "int8":
+        quantize(model)
+    return model
+
+
+def quantize(model):
+    # whisper subclasses nn.Linear only to cast dtypes, which quantize_dynamic does not
+    # recognise; on CPU fp32 the plain class behaves the same
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def supports_batch_decode(backend):
+    return backend == "torch"
+
+
+def transcribe(model, audio, verbose=False):
+    # faster-whisper models expose the stable-ts pipeline as transcribe_stable
+    run = getattr(model, "transcribe_stable", model.transcribe)
+    return run(audio=audio, language="en", verbose=verbose, vad=True, only_voice_freq=True)
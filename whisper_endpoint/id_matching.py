@@ -1,16 +1,88 @@
 from sentence_transformers import SentenceTransformer
 import pandas as pd
 import numpy as np
+import hashlib
+import io
+import os
+import threading
 
 
 class Matcher:
-    def __init__(self, id_path):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.ids = pd.read_csv(id_path)
-        self.ids["embeddings"] = self.ids["description"].apply(lambda x: self.model.encode(x))
-        self.embeds = np.stack(self.ids["embeddings"].to_list(), axis=0)
+    def __init__(self, id_path, model_name="all-MiniLM-L6-v2", threshold=0.3, cache_dir=None):
+        self.id_path = id_path
+        self.model_name = model_name
+        self.threshold = threshold
+        self.model = SentenceTransformer(model_name)
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(id_path)), ".embeddings")
+        self.lock = threading.Lock()
+        self.vectors = {}
+        self.catalogue_stat = None
+        # (ids, embeds) is replaced in one assignment, so a request sees either the old or the new catalogue
+        self.index = (np.empty(0, dtype=object), np.empty((0, 0), dtype=np.float32))
+        self.reload()
+
+    def encode(self, texts):
+        # normalized rows, so a dot product is the cosine similarity
+        embeds = self.model.encode(list(texts), batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(embeds, dtype=np.float32)
+
+    def cache_path(self, data):
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self.model_name.replace('/', '_')}-{digest}.npy")
+
+    def reload(self):
+        with self.lock:
+            stat = os.stat(self.id_path)
+            with open(self.id_path, "rb") as file:
+                data = file.read()
+            # parse the bytes that were hashed, a second read could catch the file mid-write
+            ids = pd.read_csv(io.BytesIO(data))
+            descriptions = ids["description"].tolist()
+
+            added = 0
+            path = self.cache_path(data)
+            if os.path.exists(path):
+                cached = np.load(path)
+                self.vectors.update(zip(descriptions, cached))
+            else:
+                # only descriptions we have never embedded cost model time
+                new = [d for d in dict.fromkeys(descriptions) if d not in self.vectors]
+                if new:
+                    self.vectors.update(zip(new, self.encode(new)))
+                    added = len(new)
+
+            embeds = np.ascontiguousarray(np.stack([self.vectors[d] for d in descriptions]), dtype=np.float32)
+            self.index = (ids["id"].to_numpy(), embeds)
+            self.vectors = {d: self.vectors[d] for d in descriptions}
+            self.catalogue_stat = (stat.st_mtime_ns, stat.st_size)
+            if not os.path.exists(path):
+                self.save_cache(path, embeds)
+            return {"size": len(descriptions), "embedded": added}
+
+    def reload_if_changed(self):
+        stat = os.stat(self.id_path)
+        if (stat.st_mtime_ns, stat.st_size) != self.catalogue_stat:
+            return self.reload()
+        return None
+
+    def save_cache(self, path, embeds):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, embeds)
+        os.replace(tmp_path, path)
+
+    def match_batch(self, texts, k=1):
+        ids, embeds = self.index
+        scores = self.encode(texts) @ embeds.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            candidates = candidates[np.argsort(-row[candidates])]
+            results.append([(ids[i], float(row[i])) for i in candidates if row[i] >= self.threshold])
+        return results
 
     def match(self, text):
-        embed = self.model.encode(text)
-        similarities = self.embeds @ embed
-        return self.ids.iloc[similarities.argmax()]["id"]
+        matches = self.match_batch([text], k=1)[0]
+        return matches[0][0] if matches else None
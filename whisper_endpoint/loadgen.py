@@ -0,0 +1,87 @@
+"""Local load generator for the Whisper endpoint.
+
+    python -m whisper_endpoint.loadgen --url http://127.0.0.1:8000/ --audio sample.wav -c 8 -n 200
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import time
+import numpy as np
+import requests
+
+from whisper_endpoint.audio_protocol import encode
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(path, seconds):
+    if path:
+        import librosa
+        audio, _ = librosa.load(path, sr=SAMPLE_RATE, mono=True)
+        return audio.astype(np.float32)
+    # without a recording, low-level noise still exercises decoding end to end
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.01).astype(np.float32)
+
+
+def send(url, body, timeout):
+    start = time.perf_counter()
+    try:
+        response = requests.post(url, data=body, timeout=timeout)
+        ok = response.ok
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/")
+    parser.add_argument("--audio", help="audio file to send; synthetic noise when omitted")
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of the synthetic clip")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("-n", "--requests", type=int, default=50)
+    parser.add_argument("--raw", action="store_true", help="send legacy raw float32 instead of framed int16")
+    parser.add_argument("--repeat", action="store_true",
+                        help="send identical bodies (measures the transcript cache instead of Whisper)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    audio = load_audio(args.audio, args.seconds)
+    rng = np.random.default_rng(1)
+    bodies = []
+    for i in range(1 if args.repeat else args.requests):
+        # inaudible dither makes every body unique, so the audio-hash cache never answers
+        clip = audio if args.repeat else audio + (rng.standard_normal(len(audio)) * 1e-4).astype(np.float32)
+        bodies.append(clip.tobytes() if args.raw else encode(clip))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda i: send(args.url, bodies[i % len(bodies)], args.timeout),
+                                    range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    report = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "elapsed_s": round(elapsed, 3),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
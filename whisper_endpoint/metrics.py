@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+import logging
+import time
+
+logger = logging.getLogger("ray.serve")
+
+BOUNDARIES = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+_histogram = None
+
+
+def stage_histogram():
+    # created on first use, inside the replica, so Ray exports it with the replica's tags
+    global _histogram
+    if _histogram is None:
+        from ray.serve.metrics import Histogram
+        _histogram = Histogram("voice_stage_seconds", description="Latency of each voice pipeline stage",
+                               boundaries=BOUNDARIES, tag_keys=("stage",))
+    return _histogram
+
+
+def observe(stage, seconds):
+    stage_histogram().observe(seconds, tags={"stage": stage})
+    logger.debug("stage=%s seconds=%.4f", stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
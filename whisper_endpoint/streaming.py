@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import numpy as np
+from starlette.responses import StreamingResponse
+
+from whisper_endpoint.audio_protocol import AudioFormatError, StreamDecoder
+from whisper_endpoint.metrics import timed
+
+SAMPLE_RATE = 16000
+# re-transcribe the last STREAM_WINDOW seconds every STREAM_STEP seconds of new audio
+STREAM_STEP_SAMPLES = int(float(os.environ.get("STREAM_STEP_SECONDS", 1.0)) * SAMPLE_RATE)
+STREAM_WINDOW_SAMPLES = int(float(os.environ.get("STREAM_WINDOW_SECONDS", 8.0)) * SAMPLE_RATE)
+STREAM_MIN_CONFIDENCE = float(os.environ.get("STREAM_MIN_CONFIDENCE", 0.5))
+# windows quieter than this RMS are treated as silence and never reach Whisper
+STREAM_SILENCE_RMS = float(os.environ.get("STREAM_SILENCE_RMS", 0.005))
+
+
+class RequestBody:
+    # Reads the request body in its own task and hands the chunks over through a queue.
+    # It is the only reader of receive(): StreamingResponse waits for http.disconnect on
+    # the same channel, and reading request.stream() next to it lets that listener
+    # swallow body chunks.
+
+    def __init__(self, receive):
+        self.receive = receive
+        self.chunks = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+
+    async def pump(self):
+        try:
+            while True:
+                message = await self.receive()
+                if message["type"] == "http.disconnect":
+                    self.disconnected.set()
+                    return
+                if message.get("body"):
+                    self.chunks.put_nowait(message["body"])
+                if not message.get("more_body", False):
+                    break
+        finally:
+            self.chunks.put_nowait(None)
+        # the body is complete, keep listening so a client that goes away is still noticed
+        while not self.disconnected.is_set():
+            if (await self.receive())["type"] == "http.disconnect":
+                self.disconnected.set()
+
+    async def __aiter__(self):
+        while (chunk := await self.chunks.get()) is not None:
+            yield chunk
+
+    async def wait_disconnect(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+
+class BodyStreamingResponse(StreamingResponse):
+    # StreamingResponse that streams while the request body is still arriving
+
+    def __init__(self, body, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body = body
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.create_task(self.body.pump())
+        try:
+            await super().__call__(scope, self.body.wait_disconnect, send)
+        finally:
+            task.cancel()
+
+
+async def intent_events(chunks, transcribe, match, max_seconds, step_samples=STREAM_STEP_SAMPLES,
+                        window_samples=STREAM_WINDOW_SAMPLES, min_confidence=STREAM_MIN_CONFIDENCE,
+                        silence_rms=STREAM_SILENCE_RMS):
+    # Accepts framed or raw float32 audio as a chunked body and emits NDJSON events:
+    # {"partial": text} after every window, then one {"intent": ...} as soon as
+    # the match is confident enough (or once the body ends).
+    buffered = []
+    samples = 0
+    decoder = StreamDecoder()
+    transcribed_at = 0
+    text = ""
+
+    async for chunk in chunks:
+        try:
+            with timed("audio_decode"):
+                audio = decoder.feed(chunk)
+        except AudioFormatError as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        if len(audio):
+            buffered.append(audio)
+            samples += len(audio)
+        if samples > max_seconds * SAMPLE_RATE:
+            yield json.dumps({"error": f"audio longer than {max_seconds} s"}) + "\n"
+            return
+        if samples - transcribed_at < step_samples:
+            continue
+
+        transcribed_at = samples
+        audio = np.concatenate(buffered)[-window_samples:]
+        buffered = [audio]
+        with timed("vad"):
+            silent = np.sqrt(np.mean(audio ** 2)) < silence_rms
+        if silent:
+            continue
+
+        text = await transcribe(audio)
+        if not text:
+            continue
+        yield json.dumps({"partial": text}) + "\n"
+
+        result = await match(text)
+        if result and result[1] >= min_confidence:
+            yield json.dumps({"intent": result[0], "score": result[1], "text": text}) + "\n"
+            return
+
+    if samples > transcribed_at and buffered:
+        text = await transcribe(np.concatenate(buffered)[-window_samples:])
+    result = await match(text) if text else None
+    intent, score = result if result else ("", 0.0)
+    yield json.dumps({"intent": intent, "score": score, "text": text, "final": True}) + "\n"
@@ -1,37 +1,194 @@
 import numpy as np
-import stable_whisper
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+import whisper
 import ray
 from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 from ray import serve
 import torch
 
 from whisper_endpoint.id_matching import Matcher
+from whisper_endpoint import engines
+from whisper_endpoint.cache import LRUCache, normalize_text
+from whisper_endpoint.audio_protocol import AudioFormatError, decode, read_body
+from whisper_endpoint.metrics import logger, timed
+from whisper_endpoint.streaming import BodyStreamingResponse, RequestBody, intent_events
 
 
 #serve run whisper-endpoint:depl
 
+CATALOGUE_POLL_SECONDS = float(os.environ.get("CATALOGUE_POLL_SECONDS", 5))
 
-@serve.deployment(ray_actor_options={"num_cpus": 1})
-class ModelDeployment:
-    def __init__(self):
-        self.model = stable_whisper.load_model("base")
-        self.matcher = Matcher("../id.csv")
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 4))
+BATCH_WAIT_TIMEOUT_S = float(os.environ.get("BATCH_WAIT_TIMEOUT_S", 0.05))
+# CPUs Ray reserves for a replica vs. threads torch actually uses; kept apart so
+# replicas can be packed without torch oversubscribing (or idling) the node
+RAY_NUM_CPUS = float(os.environ.get("RAY_NUM_CPUS", 1))
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", 1))
+# inference engine defaults; each Transcriber.bind(...) can override them
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "torch")
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "float32")
+# clips up to Whisper's 30 s window can be decoded together in one forward pass. That
+# path skips stable-ts' VAD and gates on no_speech_prob instead, so a clip could get a
+# different transcript depending on whether it shared a batch; off unless asked for
+BATCH_DECODE = os.environ.get("BATCH_DECODE", "0") == "1"
+BATCH_DECODE_MAX_SAMPLES = whisper.audio.N_SAMPLES
+NO_SPEECH_THRESHOLD = 0.6
 
+MAX_AUDIO_SECONDS = float(os.environ.get("MAX_AUDIO_SECONDS", 60))
+MAX_BODY_BYTES = int(os.environ.get("MAX_BODY_BYTES", 8 * 1024 * 1024))
 
-    async def __call__(self, request: Request):
-        request = await request.body()
-        data = np.frombuffer(request, np.float32)
+# shared secret for the /admin routes, sent as X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+AUDIO_CACHE_SIZE = int(os.environ.get("AUDIO_CACHE_SIZE", 256))
+TEXT_CACHE_SIZE = int(os.environ.get("TEXT_CACHE_SIZE", 1024))
+
+
+@serve.deployment(
+    ray_actor_options={"num_cpus": RAY_NUM_CPUS},
+    max_ongoing_requests=int(os.environ.get("MAX_ONGOING_REQUESTS", 16)),
+    autoscaling_config={
+        "min_replicas": int(os.environ.get("MIN_REPLICAS", 1)),
+        "max_replicas": int(os.environ.get("MAX_REPLICAS", 4)),
+        # scale on queued + running requests per replica
+        "target_ongoing_requests": float(os.environ.get("TARGET_ONGOING_REQUESTS", MAX_BATCH_SIZE)),
+    },
+)
+class Transcriber:
+    def __init__(self, backend=WHISPER_BACKEND, model_size=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                 threads=TORCH_THREADS):
+        torch.set_num_threads(threads)
+        self.backend = backend
+        self.model = engines.load_model(backend, model_size, compute_type, threads)
+
+    def reconfigure(self, config):
+        # user_config lets the batching knobs change without redeploying
+        self.transcribe_batch.set_max_batch_size(config.get("max_batch_size", MAX_BATCH_SIZE))
+        self.transcribe_batch.set_batch_wait_timeout_s(config.get("batch_wait_timeout_s", BATCH_WAIT_TIMEOUT_S))
+
+    @serve.batch(max_batch_size=MAX_BATCH_SIZE, batch_wait_timeout_s=BATCH_WAIT_TIMEOUT_S)
+    async def transcribe_batch(self, audios):
+        with timed("transcription"):
+            return await asyncio.to_thread(self.transcribe_many, audios)
+
+    def transcribe_many(self, audios):
+        short = [i for i, audio in enumerate(audios) if len(audio) <= BATCH_DECODE_MAX_SAMPLES]
+        if not BATCH_DECODE or len(audios) == 1 or len(short) < 2 or not engines.supports_batch_decode(self.backend):
+            return [self.transcribe(audio) for audio in audios]
+
+        texts = [None] * len(audios)
+        mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audios[i].copy())),
+                                                      n_mels=self.model.dims.n_mels)
+                            for i in short]).to(self.model.device)
+        options = whisper.DecodingOptions(language="en", without_timestamps=True, fp16=False)
+        for i, result in zip(short, whisper.decode(self.model, mels, options)):
+            texts[i] = "" if result.no_speech_prob > NO_SPEECH_THRESHOLD else result.text.strip()
+        for i, audio in enumerate(audios):
+            if texts[i] is None:
+                texts[i] = self.transcribe(audio)
+        return texts
+
+    def transcribe(self, data, verbose=True):
         #separated = self.separator.separate_batch(torch.from_numpy(data).unsqueeze(0)) separated[0, :, 0]
-        out = self.model.transcribe(audio=data, language="en", verbose=True, vad=True, only_voice_freq=True)
+        out = engines.transcribe(self.model, data, verbose=verbose)
+        # stable-ts runs its VAD inside transcribe, so it is part of the transcription stage
         segments = out.to_dict()["segments"]
-        print(len(segments))
+        logger.debug("transcribed %d segments", len(segments))
         if len(segments) == 0:
             return ""
-        return self.matcher.match(out.text)
+        return out.text.strip()
+
+    async def transcribe_window(self, data):
+        with timed("transcription"):
+            return await asyncio.to_thread(self.transcribe, data, False)
+
+
+@serve.deployment(ray_actor_options={"num_cpus": float(os.environ.get("MATCHER_NUM_CPUS", 0.25))})
+class IntentMatcher:
+    def __init__(self):
+        self.matcher = Matcher("../id.csv")
+        self.cache = LRUCache(TEXT_CACHE_SIZE)
+        if CATALOGUE_POLL_SECONDS > 0:
+            threading.Thread(target=self.watch_catalogue, daemon=True).start()
+
+    def watch_catalogue(self):
+        while True:
+            time.sleep(CATALOGUE_POLL_SECONDS)
+            try:
+                reloaded = self.matcher.reload_if_changed()
+                if reloaded:
+                    self.cache.clear()
+                    logger.info("Intent catalogue reloaded: %s", reloaded)
+            except Exception as e:
+                logger.warning("Intent catalogue reload failed: %s", e)
+
+    def reload(self):
+        reloaded = self.matcher.reload()
+        self.cache.clear()
+        return reloaded
+
+    def match(self, text):
+        # (id, score) of the best intent above the threshold, or None
+        key = normalize_text(text)
+        if not key:
+            return None
+        match = self.cache.get(key, False)
+        if match is False:
+            with timed("intent_matching"):
+                matches = self.matcher.match_batch([key])[0]
+            match = matches[0] if matches else None
+            self.cache.put(key, match)
+        return match
+
+
+@serve.deployment(ray_actor_options={"num_cpus": float(os.environ.get("ROUTER_NUM_CPUS", 0.1))})
+class VoiceRouter:
+    def __init__(self, transcriber, matcher):
+        self.transcriber = transcriber
+        self.matcher = matcher
+        self.transcripts = LRUCache(AUDIO_CACHE_SIZE)
+
+    async def __call__(self, request: Request):
+        path = request.url.path.rstrip("/")
+        if request.method == "POST" and path.endswith("/admin/reload-catalogue"):
+            token = request.headers.get("x-admin-token", "")
+            if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+                return PlainTextResponse("Forbidden", status_code=403)
+            # reaches one matcher replica; the others pick the change up by polling
+            return await self.matcher.reload.remote()
+        if request.method == "POST" and path.endswith("/stream"):
+            body = RequestBody(request.receive)
+            events = intent_events(body, self.transcriber.transcribe_window.remote, self.matcher.match.remote,
+                                   MAX_AUDIO_SECONDS)
+            return BodyStreamingResponse(body, events, media_type="application/x-ndjson")
+
+        try:
+            request = await read_body(request, MAX_BODY_BYTES)
+            # a retried upload of the same audio skips transcription
+            digest = hashlib.sha256(request).hexdigest()
+            text = self.transcripts.get(digest)
+            if text is None:
+                with timed("audio_decode"):
+                    data = decode(request, MAX_AUDIO_SECONDS)
+                text = await self.transcriber.transcribe_batch.remote(data)
+                self.transcripts.put(digest, text)
+        except AudioFormatError as e:
+            return PlainTextResponse(str(e), status_code=e.status_code)
+        if not text:
+            return ""
+        match = await self.matcher.match.remote(text)
+        return match[0] if match else ""
 
 
 ray.init()
-depl = ModelDeployment.bind()
+depl = VoiceRouter.bind(Transcriber.bind(), IntentMatcher.bind())
 
 #serve.run(depl, route_prefix="/")
 